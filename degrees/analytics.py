@@ -0,0 +1,178 @@
+import random
+import sys
+from collections import Counter
+
+import degrees
+
+
+class BitCounter():
+    """
+    Per-bit counters over Python integers used as bitsets: bit i of
+    `planes[j]` is bit j of the count for source i. Adding a bitset costs
+    a few big-integer operations however many sources it covers.
+    """
+
+    def __init__(self):
+        self.planes = []
+
+    def add(self, bits):
+        """
+        Adds one to the counter of every source whose bit is set in `bits`.
+        """
+        for j in range(len(self.planes)):
+            if not bits:
+                return
+            carry = self.planes[j] & bits
+            self.planes[j] ^= bits
+            bits = carry
+        if bits:
+            self.planes.append(bits)
+
+    def count(self, i):
+        return sum(((plane >> i) & 1) << j for j, plane in enumerate(self.planes))
+
+
+def multi_source_bfs(graph, sources, max_depth=None):
+    """
+    Runs a level-synchronous BFS from every person index in `sources` at
+    once over a CompactGraph. Each person carries a bitset with one bit
+    per source, so one sweep over a level's edges advances all sources.
+
+    Returns (histogram, reach): histogram[d] counts (source, person) pairs
+    at distance d, and reach[i][d] counts the people within d hops of
+    source i (so reach[i][-1] is the size of its component).
+    """
+    seen = {}
+    frontier = {}
+    for i, source in enumerate(sources):
+        frontier[source] = frontier.get(source, 0) | (1 << i)
+    for person, bits in frontier.items():
+        seen[person] = bits
+
+    # Level 0: every source reaches itself
+    histogram = [len(sources)]
+    counter = BitCounter()
+    counter.add((1 << len(sources)) - 1)
+    counters = [counter]
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_stars = graph.movie_stars
+    person_rows = graph.person_rows
+    movie_rows = graph.movie_rows
+    depth = 0
+    while frontier and (max_depth is None or depth < max_depth):
+        depth += 1
+
+        # Union of the sources reaching each movie, then of each co-star,
+        # indexing the CSR buffers between offsets rather than slicing them
+        movie_bits = {}
+        for person, bits in frontier.items():
+            movies = person_rows.get(person)
+            if movies is None:
+                movies, i, end = person_movies, person_offsets[person], person_offsets[person + 1]
+            else:
+                i, end = 0, len(movies)
+            while i < end:
+                m = movies[i]
+                i += 1
+                movie_bits[m] = movie_bits.get(m, 0) | bits
+        incoming = {}
+        for m, bits in movie_bits.items():
+            stars = movie_rows.get(m)
+            if stars is None:
+                stars, j, stop = movie_stars, movie_offsets[m], movie_offsets[m + 1]
+            else:
+                j, stop = 0, len(stars)
+            while j < stop:
+                q = stars[j]
+                j += 1
+                incoming[q] = incoming.get(q, 0) | bits
+
+        # Keep only the (source, person) pairs reached for the first time
+        counter = BitCounter()
+        frontier = {}
+        total = 0
+        for q, bits in incoming.items():
+            new = bits & ~seen.get(q, 0)
+            if new:
+                seen[q] = seen.get(q, 0) | new
+                frontier[q] = new
+                counter.add(new)
+                total += new.bit_count()
+        if not frontier:
+            break
+        histogram.append(total)
+        counters.append(counter)
+
+    reach = []
+    for i in range(len(sources)):
+        cumulative = 0
+        row = []
+        for counter in counters:
+            cumulative += counter.count(i)
+            row.append(cumulative)
+        reach.append(row)
+    return histogram, reach
+
+
+def mean_separation(histogram):
+    """
+    Returns the average distance over the connected pairs of a histogram,
+    leaving out each source paired with itself, or None if there are none.
+    """
+    pairs = sum(histogram[1:])
+    if pairs == 0:
+        return None
+    return sum(d * n for d, n in enumerate(histogram)) / pairs
+
+
+def sample_sources(graph, k, seed=None):
+    """
+    Picks `k` distinct people with at least one movie, uniformly at random.
+    """
+    rng = random.Random(seed)
+    candidates = [p for p in range(graph.num_people) if len(graph.movies_of(p))]
+    return rng.sample(candidates, min(k, len(candidates)))
+
+
+def batched_stats(graph, sources, batch=4096, max_depth=None):
+    """
+    Runs multi_source_bfs over `sources` in batches of at most `batch`
+    sources, bounding the width of the bitsets, and merges the histograms.
+    Returns the merged histogram and the concatenated reach rows.
+    """
+    histogram = Counter()
+    reach = []
+    for start in range(0, len(sources), batch):
+        part, part_reach = multi_source_bfs(graph, sources[start:start + batch], max_depth)
+        for d, n in enumerate(part):
+            histogram[d] += n
+        reach.extend(part_reach)
+    return [histogram[d] for d in range(len(histogram))], reach
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python analytics.py directory [samples]")
+    samples = int(sys.argv[2]) if len(sys.argv) == 3 else 1000
+
+    print("Loading data...")
+    degrees.load_data(sys.argv[1], compact=True)
+    graph = degrees.compact_graph()
+    sources = sample_sources(graph, samples, seed=0)
+
+    print(f"Running BFS from {len(sources)} people...")
+    histogram, reach = batched_stats(graph, sources)
+    for d, n in enumerate(histogram):
+        print(f"  {d} degrees: {n}")
+    mean = mean_separation(histogram)
+    if mean is not None:
+        print(f"Average degrees of separation: {mean:.3f}")
+    sizes = sorted(row[-1] for row in reach)
+    if sizes:
+        print(f"Median reach: {sizes[len(sizes) // 2]} people")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import csv
+import gc
+import json
+import multiprocessing
+import sys
+
+import degrees
+
+
+def resolve(value):
+    """
+    Returns the person_id for `value`, which may be a person ID or a name,
+    or raises LookupError if it matches nobody or more than one person.
+    """
+    if value in degrees.people:
+        return value
+    person_ids = degrees.names.get(value.lower(), set())
+    if len(person_ids) == 0:
+        raise LookupError(f"person not found: {value}")
+    if len(person_ids) > 1:
+        raise LookupError(
+            f"ambiguous name: {value} ({', '.join(sorted(person_ids))})"
+        )
+    return next(iter(person_ids))
+
+
+def answer(pair):
+    """
+    Returns the JSON-serializable result of one (source, target) query.
+    """
+    source, target = pair
+    result = {"source": source, "target": target}
+    try:
+        source_id = resolve(source)
+        target_id = resolve(target)
+    except LookupError as e:
+        result["error"] = str(e)
+        return result
+
+    path = degrees.shortest_path(source_id, target_id, bidirectional=True)
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [[movie_id, person_id] for movie_id, person_id in path]
+    return result
+
+
+def read_pairs(f):
+    """
+    Yields (source, target) pairs from CSV lines of `f`, skipping blank
+    lines. Each side may be a person ID or a name.
+    """
+    for row in csv.reader(f):
+        if not row:
+            continue
+        if len(row) != 2:
+            raise ValueError(f"expected 'source,target', got {row}")
+        yield row[0].strip(), row[1].strip()
+
+
+def run(pairs, workers=None, out=sys.stdout):
+    """
+    Answers every pair, writing one JSON line per pair to `out` in input
+    order. Results are streamed as soon as they are ready.
+
+    Queries are spread over a pool of `workers` forked processes, forked
+    after load_data. A CompactGraph keeps the graph in a few flat buffers
+    (or the shared mapping of a snapshot) that the workers only read, so
+    they share one copy. Dicts of sets are not shared that way: reading
+    them updates reference counts, which copies every page touched into
+    each worker.
+    """
+    if workers is not None and workers <= 1:
+        for pair in pairs:
+            print(json.dumps(answer(pair)), file=out, flush=True)
+        return
+
+    # Keep the garbage collector from touching, and so copying, the
+    # objects loaded before the fork; the caller's objects go back to
+    # the collector once the pool is closed
+    gc.freeze()
+    try:
+        context = multiprocessing.get_context("fork")
+        with context.Pool(workers) as pool:
+            for result in pool.imap(answer, pairs, chunksize=16):
+                print(json.dumps(result), file=out, flush=True)
+    finally:
+        gc.unfreeze()
+
+
+def main():
+    args = sys.argv[1:]
+
+    # The compact graph is the default, since workers share it; --compact
+    # is still accepted
+    compact = "--dicts" not in args
+    for flag in ("--compact", "--dicts"):
+        if flag in args:
+            args.remove(flag)
+    workers = None
+    if "--workers" in args:
+        i = args.index("--workers")
+        workers = int(args[i + 1])
+        del args[i:i + 2]
+    if len(args) not in (1, 2):
+        sys.exit("Usage: python batch.py [--dicts] [--workers N] "
+                 "directory [pairs.csv]")
+    directory = args[0]
+
+    # Load once in the parent so that forked workers share the data
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(directory, compact=compact)
+    print("Data loaded.", file=sys.stderr)
+
+    if len(args) == 2:
+        with open(args[1], encoding="utf-8") as f:
+            run(read_pairs(f), workers)
+    else:
+        run(read_pairs(sys.stdin), workers)
+
+
+if __name__ == "__main__":
+    main()
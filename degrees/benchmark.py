@@ -0,0 +1,240 @@
+import csv
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import batch
+import degrees
+import snapshot
+from landmarks import LandmarkOracle
+from util import SearchStats
+
+# Syllables that synthetic names are made of
+SYLLABLES = ["an", "bel", "cor", "da", "el", "fin", "gar", "ha", "is", "jo",
+             "ka", "lo", "mar", "ne", "or", "pa", "ri", "sa", "tor", "vi"]
+
+
+def synthetic_name(rng):
+    first = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3)))
+    last = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+    return f"{first.capitalize()} {last.capitalize()}"
+
+
+def generate(directory, num_people, num_movies, cast=4, seed=0):
+    """
+    Writes people.csv, movies.csv and stars.csv for a synthetic IMDB-like
+    dataset into `directory`. Actors are picked with Zipf-like weights so
+    that a few appear in many movies and most in one or two, and every
+    movie has between 1 and 2 * `cast` - 1 stars. A few star rows refer to
+    unknown people, as in the real data.
+    """
+    rng = random.Random(seed)
+    with open(os.path.join(directory, "people.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(num_people):
+            birth = rng.randint(1900, 2005) if rng.random() < 0.8 else ""
+            writer.writerow([str(i), synthetic_name(rng), birth])
+
+    with open(os.path.join(directory, "movies.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(num_movies):
+            writer.writerow([f"m{i}", f"Movie {i}", rng.randint(1920, 2020)])
+
+    # Shuffle ranks so that popular actors are spread over the ID range
+    ranks = list(range(num_people))
+    rng.shuffle(ranks)
+    cum_weights = []
+    total = 0.0
+    for rank in range(1, num_people + 1):
+        total += 1 / rank
+        cum_weights.append(total)
+
+    with open(os.path.join(directory, "stars.csv"), "w",
+              encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for i in range(num_movies):
+            size = rng.randint(1, 2 * cast - 1)
+            for rank in rng.choices(range(num_people), cum_weights=cum_weights, k=size):
+                writer.writerow([str(ranks[rank]), f"m{i}"])
+            if rng.random() < 0.01:
+                writer.writerow([f"missing{i}", f"m{i}"])
+
+
+def timed(function, *args, **kwargs):
+    """
+    Returns (result, seconds) of calling `function`.
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def query_pairs(count, seed=0):
+    """
+    Picks `count` random (source, target) pairs among people with movies.
+    """
+    rng = random.Random(seed)
+    candidates = sorted(
+        person_id for person_id in degrees.people
+        if degrees.people[person_id]["movies"]
+    )
+    return [tuple(rng.sample(candidates, 2)) for _ in range(count)]
+
+
+def run_queries(pairs, **options):
+    """
+    Runs shortest_path over `pairs` and returns the accumulated SearchStats
+    and the number of connected pairs.
+    """
+    stats = SearchStats()
+    connected = 0
+    for source, target in pairs:
+        if degrees.shortest_path(source, target, stats=stats, **options) is not None:
+            connected += 1
+    return stats, connected
+
+
+def summary(stats, connected):
+    return {
+        "queries": stats.queries,
+        "connected": connected,
+        "seconds": stats.elapsed,
+        "mean_ms": 1000 * stats.elapsed / max(stats.queries, 1),
+        "mean_explored": stats.explored / max(stats.queries, 1),
+        "mean_expansions": stats.expansions / max(stats.queries, 1),
+        "peak_frontier": stats.peak_frontier,
+    }
+
+
+def reset():
+    """
+    Empties the data loaded by degrees.load_data.
+    """
+    degrees.graph = None
+    degrees.names, degrees.people, degrees.movies = {}, {}, {}
+
+
+def benchmark(directory, queries=100, workers=None, seed=0, baseline=10):
+    """
+    Times loading, single queries with every search engine and a batch
+    run over the dataset in `directory`. Returns the results as a dict.
+
+    The original Node-based BFS, whose frontier membership test is linear,
+    only runs the first `baseline` queries.
+    """
+    results = {}
+
+    # A fresh snapshot would be read in place of the CSVs; it is built
+    # again at the end, so remove it to time the CSV loads
+    path = snapshot.snapshot_path(directory)
+    existed = os.path.exists(path)
+    if existed:
+        os.remove(path)
+
+    # Loading
+    reset()
+    dropped, results["load_dicts"] = timed(degrees.load_data, directory)
+    results["dropped"] = dropped
+    results["people"] = len(degrees.people)
+    results["movies"] = len(degrees.movies)
+    pairs = query_pairs(queries, seed)
+    if workers is not None and workers > 1:
+        reset()
+        _, results["load_dicts_parallel"] = timed(
+            degrees.load_data, directory, workers=workers
+        )
+
+    # Queries over the dicts
+    results["bfs"] = summary(*run_queries(pairs[:baseline]))
+    results["bidirectional"] = summary(*run_queries(pairs, bidirectional=True))
+
+    # Queries over the compact graph
+    reset()
+    _, results["load_compact"] = timed(degrees.load_data, directory, compact=True)
+    if workers is not None and workers > 1:
+        reset()
+        _, results["load_compact_parallel"] = timed(
+            degrees.load_data, directory, compact=True, workers=workers
+        )
+    results["compact"] = summary(*run_queries(pairs))
+    oracle, results["landmarks_build"] = timed(LandmarkOracle.build)
+    _, results["landmark_bounds"] = timed(
+        lambda: [oracle.bounds(source, target) for source, target in pairs]
+    )
+
+    # Batch of queries, fanned out over worker processes
+    out = io.StringIO()
+    _, results["batch"] = timed(batch.run, pairs, workers, out)
+
+    # Snapshot; built last, since load_data prefers a fresh one, and
+    # removed again unless the directory already had one
+    _, results["snapshot_build"] = timed(snapshot.build, directory)
+    reset()
+    _, results["load_snapshot"] = timed(degrees.load_data, directory, compact=True)
+    if not existed:
+        os.remove(path)
+    return results
+
+
+def report(results):
+    print(f"{results['people']} people, {results['movies']} movies, "
+          f"{results['dropped']} star rows dropped")
+    for key, value in results.items():
+        if isinstance(value, dict):
+            print(f"  {key:22} {value['mean_ms']:9.3f} ms/query  "
+                  f"explored {value['mean_explored']:10.1f}  "
+                  f"expanded {value['mean_expansions']:11.1f}  "
+                  f"peak frontier {value['peak_frontier']}")
+        elif isinstance(value, float):
+            print(f"  {key:22} {value:9.3f} s")
+
+
+def main():
+    args = sys.argv[1:]
+    as_json = "--json" in args
+    if as_json:
+        args.remove("--json")
+    options = {"--people": "100000", "--movies": "50000", "--queries": "100",
+               "--baseline": "10", "--seed": "0", "--workers": None}
+    for option in options:
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+    if len(args) > 1:
+        sys.exit("Usage: python benchmark.py [--people N] [--movies N] "
+                 "[--queries N] [--baseline N] [--seed N] [--workers N] "
+                 "[--json] [directory]")
+    workers = options["--workers"] and int(options["--workers"])
+    seed = int(options["--seed"])
+
+    with tempfile.TemporaryDirectory() as temporary:
+        # Benchmark the given dataset, or generate one
+        if args:
+            directory = args[0]
+        else:
+            directory = temporary
+            print("Generating data...", file=sys.stderr)
+            generate(directory, int(options["--people"]),
+                     int(options["--movies"]), seed=seed)
+        print("Running benchmark...", file=sys.stderr)
+        results = benchmark(directory, int(options["--queries"]), workers,
+                            seed, int(options["--baseline"]))
+
+    if as_json:
+        print(json.dumps(results, indent=2))
+    else:
+        report(results)
+
+
+if __name__ == "__main__":
+    main()
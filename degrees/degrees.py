@@ -1,7 +1,12 @@
 import csv
 import sys
+import time
 
-from util import Node, StackFrontier, QueueFrontier
+import loader
+import snapshot
+from graph import CompactGraph
+from nameindex import NameIndex
+from util import Node, StackFrontier, QueueFrontier, SearchStats
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,11 +17,58 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# CompactGraph holding the data when loaded in compact mode, else None
+graph = None
 
-def load_data(directory):
+# NameIndex for prefix and fuzzy lookups of person names
+name_index = None
+
+
+def load_data(directory, compact=False, workers=None):
     """
     Load data from CSV files into memory.
+
+    If `compact` is true, hold the graph in a CompactGraph instead of
+    dicts of sets; `names`, `people` and `movies` then become read-only
+    views over it. A snapshot built by snapshot.py that is newer than the
+    CSV files is then memory-mapped instead of parsing them.
+
+    If `workers` is more than 1, the CSV files are split into chunks
+    and parsed by that many processes.
+
+    Returns the number of star rows dropped because they refer to
+    an unknown person or movie.
+    """
+    global graph, names, people, movies, name_index
+    if compact:
+        if snapshot.is_fresh(directory):
+            graph = snapshot.read_snapshot(snapshot.snapshot_path(directory))
+        elif workers is not None and workers > 1:
+            graph = loader.read_graph(directory, workers)
+        else:
+            graph = CompactGraph.from_csv(directory)
+        dropped = graph.dropped
+    else:
+        if graph is not None:
+            graph = None
+            names, people, movies = {}, {}, {}
+        dropped = load_dicts(directory, workers)
+        name_index = NameIndex.from_dicts(people, names)
+        return dropped
+
+    names, people, movies = graph.names, graph.people, graph.movies
+    name_index = NameIndex.from_graph(graph)
+    return dropped
+
+
+def load_dicts(directory, workers=None):
+    """
+    Load data from CSV files into the `names`, `people` and `movies` dicts,
+    returning the number of star rows dropped.
     """
+    if workers is not None and workers > 1:
+        return loader.load_into(directory, people, movies, names, workers)
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -41,25 +93,41 @@ def load_data(directory):
                 "stars": set()
             }
 
-    # Load stars
+    # Load stars, counting rows that refer to unknown people or movies
+    dropped = 0
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
-            try:
+            if row["person_id"] in people and row["movie_id"] in movies:
                 people[row["person_id"]]["movies"].add(row["movie_id"])
                 movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+            else:
+                dropped += 1
+    return dropped
+
+
+def compact_graph():
+    """
+    Returns the loaded data as a CompactGraph, building one from the
+    dicts if they were loaded in dict mode.
+    """
+    if graph is not None:
+        return graph
+    return CompactGraph.from_dicts(people, movies)
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    args = sys.argv[1:]
+    compact = "--compact" in args
+    if compact:
+        args.remove("--compact")
+    if len(args) > 1:
+        sys.exit("Usage: python degrees.py [--compact] [directory]")
+    directory = args[0] if len(args) == 1 else "large"
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(directory, compact=compact)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -69,7 +137,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, bidirectional=True)
 
     if path is None:
         print("Not connected.")
@@ -84,16 +152,48 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    If `bidirectional` is true, search from both ends at once
+    and meet in the middle.
+
+    If a util.SearchStats is given as `stats`, the search adds its
+    counters and wall time to it.
+
+    If no possible path, returns None.
+    """
+    if stats is None:
+        stats = SearchStats()
+    start = time.perf_counter()
+    try:
+        if bidirectional:
+            return bidirectional_path(source, target, stats)
+        if graph is not None:
+            return compact_path(source, target, stats)
+        return breadth_first_path(source, target, stats)
+    finally:
+        stats.queries += 1
+        stats.elapsed += time.perf_counter() - start
+
+
+def breadth_first_path(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, using a breadth-first
+    search over Node objects.
+
     If no possible path, returns None.
     """
 
-    # Keep track of states explored
+    # Keep track of states explored, frontier size and neighbors examined
     num_explored = 0
+    peak_frontier = 0
+    num_expansions = 0
+    if stats is None:
+        stats = SearchStats()
 
     # Inititiate starting state/node
     start = Node(state=source, parent=None, action=None)
@@ -112,14 +212,17 @@ def shortest_path(source, target):
     while True:   
         # If nothing left in frontier, then no path
         if frontier.empty():
+            stats.record(num_explored, peak_frontier, num_expansions)
             return None
         
         # Choose a node from the frontier
+        peak_frontier = max(peak_frontier, len(frontier.frontier))
         node = frontier.remove()
         num_explored += 1
 
         # If note is the goal, then we have a solution
         if node.state == goal.state:
+            stats.record(num_explored, peak_frontier, num_expansions)
             solution = []
             while node.parent is not None:
                 solution.append((node.action, node.state))
@@ -132,11 +235,117 @@ def shortest_path(source, target):
 
         # Add neighbors to frontier (unsure)
         for movie_id, person_id in neighbors_for_person(node.state):
+            num_expansions += 1
             if not frontier.contains_state(person_id) and person_id not in explored:
                 child = Node(state=person_id, parent=node, action=movie_id)
                 frontier.add(child)
 
 
+def compact_path(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs that connect
+    the source to the target by searching the CSR buffers of `graph`.
+
+    If no possible path, returns None.
+    """
+    path = graph.shortest_path(
+        graph.person_index(source), graph.person_index(target), stats
+    )
+    if path is None:
+        return None
+    return [(graph.movie_ids[m], graph.person_ids[p]) for m, p in path]
+
+
+def bidirectional_path(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, expanding one BFS level
+    at a time from whichever end has the smaller frontier.
+
+    If no possible path, returns None.
+    """
+    if stats is None:
+        stats = SearchStats()
+    if source == target:
+        return []
+
+    # Map each reached person to the (movie_id, person_id) step that
+    # leads back towards the source (forward) or on to the target (backward)
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+        stats.record(0, len(forward_frontier) + len(backward_frontier), 0)
+
+        # Grow the cheaper side; the first meeting found is always optimal
+        # because both visited sets were disjoint before this level
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = _expand_level(
+                forward_frontier, forward, backward, stats
+            )
+        else:
+            backward_frontier, meeting = _expand_level(
+                backward_frontier, backward, forward, stats
+            )
+            if meeting is not None:
+                # Expanding from the target reaches `person_id` from `parent`,
+                # so the path runs person_id -> parent
+                movie_id, parent, person_id = meeting
+                meeting = (movie_id, person_id, parent)
+
+        if meeting is not None:
+            movie_id, before, after = meeting
+            return _join_paths(forward, backward, before, movie_id, after)
+
+    return None
+
+
+def _expand_level(frontier, visited, other, stats):
+    """
+    Expands every person in `frontier` by one step, recording parents in
+    `visited`. Returns the next frontier and, if a neighbor was already
+    reached by the `other` search, the (movie_id, parent, person_id) meeting.
+    """
+    next_frontier = []
+    for parent in frontier:
+        neighbors = neighbors_for_person(parent)
+        stats.record(1, 0, len(neighbors))
+        for movie_id, person_id in neighbors:
+            if person_id in visited:
+                continue
+            visited[person_id] = (movie_id, parent)
+            if person_id in other:
+                return next_frontier, (movie_id, parent, person_id)
+            next_frontier.append(person_id)
+    return next_frontier, None
+
+
+def _join_paths(forward, backward, before, movie_id, after):
+    """
+    Builds the source-to-target path through the edge `before` -> `after`
+    (co-stars in `movie_id`) from the two parent maps.
+    """
+    # Walk back from `before` to the source
+    solution = []
+    person_id = before
+    while forward[person_id] is not None:
+        step_movie, parent = forward[person_id]
+        solution.append((step_movie, person_id))
+        person_id = parent
+    solution.reverse()
+
+    # Cross the meeting edge, then walk on from `after` to the target
+    solution.append((movie_id, after))
+    person_id = after
+    while backward[person_id] is not None:
+        step_movie, child = backward[person_id]
+        solution.append((step_movie, child))
+        person_id = child
+    return solution
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
@@ -168,6 +377,13 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        p = graph.person_index(person_id)
+        return {
+            (graph.movie_ids[m], graph.person_ids[q])
+            for m, q in graph.neighbors(p)
+        }
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -0,0 +1,620 @@
+import csv
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping, Sequence
+from itertools import accumulate
+
+# Typecode used for every offset and index buffer (signed 32-bit)
+INDEX = "i"
+
+
+class StringTable(Sequence):
+    """
+    Sequence of strings packed into one UTF-8 buffer, with
+    `offsets[i]:offsets[i + 1]` delimiting the i-th string.
+    Strings appended later are kept in the `extra` list.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+        self.size = len(offsets) - 1
+        self.extra = []
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = array(INDEX, [0])
+        offsets.extend(accumulate(len(b) for b in encoded))
+        return cls(offsets, b"".join(encoded))
+
+    def __len__(self):
+        return self.size + len(self.extra)
+
+    def __getitem__(self, i):
+        if i >= self.size:
+            return self.extra[i - self.size]
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def append(self, string):
+        self.extra.append(string)
+
+
+class SortedKeys(Sequence):
+    """
+    Read-only view of `table` in the order given by `order`, optionally
+    passed through `transform`, so that it can be searched with bisect.
+    """
+
+    def __init__(self, table, order, transform=None):
+        self.table = table
+        self.order = order
+        self.transform = transform
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        value = self.table[self.order[i]]
+        return value if self.transform is None else self.transform(value)
+
+    def find(self, key):
+        """
+        Returns the range of positions whose key equals `key`.
+        """
+        return bisect_left(self, key), bisect_right(self, key)
+
+
+class CompactGraph():
+    """
+    The person-movie graph with IDs remapped to dense integers.
+
+    Edges are held twice in CSR form: `person_movies[person_offsets[p]:
+    person_offsets[p + 1]]` lists the movies of person p, and
+    `movie_stars[movie_offsets[m]:movie_offsets[m + 1]]` the stars of movie m.
+
+    People, movies and stars added after loading go into small overlay
+    dicts: a person or movie whose row changed gets its whole row copied
+    into `person_rows` or `movie_rows`, which take precedence over the
+    CSR buffers.
+    """
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years,
+                 person_offsets, person_movies, movie_offsets, movie_stars,
+                 person_order, movie_order, name_order):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+        self._person_movies = memoryview(person_movies)
+        self._movie_stars = memoryview(movie_stars)
+
+        # Overlay of rows changed since loading, and of added IDs and names
+        self.person_rows = {}
+        self.movie_rows = {}
+        self.added_people = {}
+        self.added_movies = {}
+        self.added_names = {}
+
+        # Number of star rows dropped for referring to unknown IDs
+        self.dropped = 0
+
+        # Permutations sorting people by ID, movies by ID and people by name
+        self.person_order = person_order
+        self.movie_order = movie_order
+        self.name_order = name_order
+        self._person_keys = SortedKeys(person_ids, person_order)
+        self._movie_keys = SortedKeys(movie_ids, movie_order)
+        self.name_keys = SortedKeys(person_names, name_order, str.lower)
+
+        # Search buffers reused by every query, allocated on first use; an
+        # entry is only valid while its stamp matches the current search
+        self._stamp = 0
+        self._person_stamps = None
+        self._movie_stamps = None
+        self._parents = None
+        self._via = None
+        self._queue = None
+
+        self.people = PeopleView(self)
+        self.movies = MoviesView(self)
+        self.names = NamesView(self)
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Loads people.csv, movies.csv and stars.csv from `directory`.
+        Star rows referring to unknown people or movies are dropped.
+        """
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            people = [(row["id"], row["name"], row["birth"])
+                      for row in csv.DictReader(f)]
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            movies = [(row["id"], row["title"], row["year"])
+                      for row in csv.DictReader(f)]
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            stars = [(row["person_id"], row["movie_id"])
+                     for row in csv.DictReader(f)]
+        return cls.from_rows(people, movies, stars)
+
+    @classmethod
+    def from_rows(cls, people, movies, stars):
+        """
+        Builds a graph from (id, name, birth) people rows,
+        (id, title, year) movie rows and (person_id, movie_id) star rows,
+        counting star rows that refer to unknown IDs in `dropped`.
+        """
+        person_index = {row[0]: i for i, row in enumerate(people)}
+        movie_index = {row[0]: i for i, row in enumerate(movies)}
+
+        edge_people = array(INDEX)
+        edge_movies = array(INDEX)
+        dropped = 0
+        for person_id, movie_id in stars:
+            p = person_index.get(person_id)
+            m = movie_index.get(movie_id)
+            if p is not None and m is not None:
+                edge_people.append(p)
+                edge_movies.append(m)
+            else:
+                dropped += 1
+        del person_index, movie_index
+        return cls.from_edges(people, movies, edge_people, edge_movies, dropped)
+
+    @classmethod
+    def from_edges(cls, people, movies, edge_people, edge_movies, dropped=0):
+        """
+        Builds a graph from people and movie rows as from_rows takes them,
+        and the stars as parallel arrays of dense person and movie indices.
+        """
+        person_offsets, person_movies = build_csr(len(people), edge_people, edge_movies)
+        movie_offsets, movie_stars = transpose_csr(len(movies), person_offsets, person_movies)
+        return cls.from_csr(people, movies, person_offsets, person_movies,
+                            movie_offsets, movie_stars, dropped)
+
+    @classmethod
+    def from_csr(cls, people, movies, person_offsets, person_movies,
+                 movie_offsets, movie_stars, dropped=0):
+        """
+        Builds a graph from people and movie rows as from_rows takes them,
+        and the CSR buffers of the movies of every person and the stars of
+        every movie, as build_csr returns them.
+        """
+        person_ids = [row[0] for row in people]
+        movie_ids = [row[0] for row in movies]
+        lowered = [row[1].lower() for row in people]
+        graph = cls(
+            StringTable.from_strings(person_ids),
+            StringTable.from_strings(row[1] for row in people),
+            StringTable.from_strings(row[2] for row in people),
+            StringTable.from_strings(movie_ids),
+            StringTable.from_strings(row[1] for row in movies),
+            StringTable.from_strings(row[2] for row in movies),
+            person_offsets, person_movies, movie_offsets, movie_stars,
+            sorted_order(person_ids), sorted_order(movie_ids),
+            sorted_order(lowered),
+        )
+        graph.dropped = dropped
+        return graph
+
+    @classmethod
+    def from_dicts(cls, people, movies):
+        """
+        Builds a graph from the `people` and `movies` dicts of degrees.py.
+        """
+        return cls.from_rows(
+            [(i, p["name"], p["birth"]) for i, p in people.items()],
+            [(i, m["title"], m["year"]) for i, m in movies.items()],
+            [(i, m) for i, p in people.items() for m in p["movies"]],
+        )
+
+    @property
+    def num_people(self):
+        return len(self.person_ids)
+
+    @property
+    def num_movies(self):
+        return len(self.movie_ids)
+
+    @property
+    def has_updates(self):
+        return bool(self.person_rows or self.movie_rows
+                    or self.added_people or self.added_movies)
+
+    def person_index(self, person_id):
+        """
+        Returns the dense index of `person_id`, or None if unknown.
+        """
+        lo, hi = self._person_keys.find(person_id)
+        if lo < hi:
+            return self.person_order[lo]
+        return self.added_people.get(person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Returns the dense index of `movie_id`, or None if unknown.
+        """
+        lo, hi = self._movie_keys.find(movie_id)
+        if lo < hi:
+            return self.movie_order[lo]
+        return self.added_movies.get(movie_id)
+
+    def people_named(self, name):
+        """
+        Returns the dense indices of people whose lowercased name is `name`.
+        """
+        lo, hi = self.name_keys.find(name)
+        return [self.name_order[i] for i in range(lo, hi)] + \
+            self.added_names.get(name, [])
+
+    def movies_of(self, p):
+        """
+        Returns the movies of person `p` as a view of the CSR buffer,
+        or as its overlay row if it changed since loading.
+        """
+        row = self.person_rows.get(p)
+        if row is not None:
+            return row
+        return self._person_movies[self.person_offsets[p]:self.person_offsets[p + 1]]
+
+    def stars_of(self, m):
+        """
+        Returns the stars of movie `m` as a view of the CSR buffer,
+        or as its overlay row if it changed since loading.
+        """
+        row = self.movie_rows.get(m)
+        if row is not None:
+            return row
+        return self._movie_stars[self.movie_offsets[m]:self.movie_offsets[m + 1]]
+
+    def neighbors(self, p):
+        """
+        Yields (movie, person) index pairs for people who starred with `p`.
+        """
+        for m in self.movies_of(p):
+            for q in self.stars_of(m):
+                yield m, q
+
+    def add_person(self, person_id, name, birth):
+        """
+        Adds a person with no movies and returns their dense index.
+        """
+        p = self.num_people
+        self.person_ids.append(person_id)
+        self.person_names.append(name)
+        self.person_births.append(birth)
+        self.person_rows[p] = array(INDEX)
+        self.added_people[person_id] = p
+        self.added_names.setdefault(name.lower(), []).append(p)
+        return p
+
+    def add_movie(self, movie_id, title, year):
+        """
+        Adds a movie with no stars and returns its dense index.
+        """
+        m = self.num_movies
+        self.movie_ids.append(movie_id)
+        self.movie_titles.append(title)
+        self.movie_years.append(year)
+        self.movie_rows[m] = array(INDEX)
+        self.added_movies[movie_id] = m
+        return m
+
+    def add_star(self, p, m):
+        """
+        Records that person `p` starred in movie `m`.
+        Returns False if that was already known.
+        """
+        movies = self.person_rows.get(p)
+        if movies is None:
+            movies = self.person_rows[p] = array(INDEX, self.movies_of(p))
+        if m in movies:
+            return False
+        stars = self.movie_rows.get(m)
+        if stars is None:
+            stars = self.movie_rows[m] = array(INDEX, self.stars_of(m))
+        movies.append(m)
+        stars.append(p)
+        return True
+
+    def rebuilt(self):
+        """
+        Returns a new graph with every overlay change merged into the CSR
+        buffers and sorted orders.
+        """
+        return CompactGraph.from_rows(
+            list(zip(self.person_ids, self.person_names, self.person_births)),
+            list(zip(self.movie_ids, self.movie_titles, self.movie_years)),
+            [(self.person_ids[p], self.movie_ids[m])
+             for p in range(self.num_people) for m in self.movies_of(p)],
+        )
+
+    def shortest_path(self, source, target, stats=None):
+        """
+        Returns the shortest list of (movie, person) index pairs that
+        connect `source` to `target`, or None if they are not connected.
+
+        The BFS indexes the CSR buffers directly between a row's offsets,
+        so expanding a person or movie allocates nothing, and every person
+        and movie is expanded at most once.
+        If a util.SearchStats is given as `stats`, its counters are updated.
+        """
+        if source == target:
+            return []
+
+        stamp = self._next_stamp()
+        person_stamps = self._person_stamps
+        movie_stamps = self._movie_stamps
+        parents = self._parents
+        via = self._via
+        queue = self._queue
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        person_rows = self.person_rows
+        movie_rows = self.movie_rows
+
+        person_stamps[source] = stamp
+        queue[0] = source
+        head, tail = 0, 1
+        peak = 1
+        expansions = 0
+        path = None
+        while head < tail and path is None:
+            if tail - head > peak:
+                peak = tail - head
+            p = queue[head]
+            head += 1
+            movies = person_rows.get(p)
+            if movies is None:
+                movies, i, end = person_movies, person_offsets[p], person_offsets[p + 1]
+            else:
+                i, end = 0, len(movies)
+            while i < end:
+                m = movies[i]
+                i += 1
+                if movie_stamps[m] == stamp:
+                    continue
+                movie_stamps[m] = stamp
+                stars = movie_rows.get(m)
+                if stars is None:
+                    stars, j, stop = movie_stars, movie_offsets[m], movie_offsets[m + 1]
+                else:
+                    j, stop = 0, len(stars)
+                expansions += stop - j
+                while j < stop:
+                    q = stars[j]
+                    j += 1
+                    if person_stamps[q] == stamp:
+                        continue
+                    person_stamps[q] = stamp
+                    parents[q] = p
+                    via[q] = m
+                    if q == target:
+                        path = self._trace(source, target)
+                        break
+                    queue[tail] = q
+                    tail += 1
+                if path is not None:
+                    break
+        if stats is not None:
+            stats.record(head, peak, expansions)
+        return path
+
+    def bfs_tree(self, source):
+        """
+        Runs a full BFS from `source` and returns (parents, via, depths)
+        buffers: person q was reached from `parents[q]` through movie
+        `via[q]` at depth `depths[q]`, which is -1 if q is unreachable.
+        """
+        parents = array(INDEX, [-1]) * self.num_people
+        via = array(INDEX, [-1]) * self.num_people
+        depths = array(INDEX, [-1]) * self.num_people
+        movie_seen = bytearray(self.num_movies)
+        queue = array(INDEX, [source])
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        person_rows = self.person_rows
+        movie_rows = self.movie_rows
+
+        depths[source] = 0
+        head = 0
+        while head < len(queue):
+            p = queue[head]
+            head += 1
+            depth = depths[p] + 1
+            movies = person_rows.get(p)
+            if movies is None:
+                movies, i, end = person_movies, person_offsets[p], person_offsets[p + 1]
+            else:
+                i, end = 0, len(movies)
+            while i < end:
+                m = movies[i]
+                i += 1
+                if movie_seen[m]:
+                    continue
+                movie_seen[m] = 1
+                stars = movie_rows.get(m)
+                if stars is None:
+                    stars, j, stop = movie_stars, movie_offsets[m], movie_offsets[m + 1]
+                else:
+                    j, stop = 0, len(stars)
+                while j < stop:
+                    q = stars[j]
+                    j += 1
+                    if depths[q] == -1:
+                        depths[q] = depth
+                        parents[q] = p
+                        via[q] = m
+                        queue.append(q)
+        return parents, via, depths
+
+    def _next_stamp(self):
+        if self._parents is None or len(self._parents) < self.num_people \
+                or len(self._movie_stamps) < self.num_movies:
+            # First search, or people or movies were added since
+            self._parents = array(INDEX, bytes(4 * self.num_people))
+            self._via = array(INDEX, bytes(4 * self.num_people))
+            self._queue = array(INDEX, bytes(4 * self.num_people))
+            self._person_stamps = None
+        self._stamp += 1
+        if self._person_stamps is None or self._stamp > 0xFFFFFFFF:
+            # Fresh buffers, or wrapped around: clear the stamps so that
+            # stale entries cannot match
+            self._stamp = 1
+            self._person_stamps = array("I", bytes(4 * self.num_people))
+            self._movie_stamps = array("I", bytes(4 * self.num_movies))
+        return self._stamp
+
+    def _trace(self, source, target):
+        solution = []
+        p = target
+        while p != source:
+            solution.append((self._via[p], p))
+            p = self._parents[p]
+        solution.reverse()
+        return solution
+
+
+class PeopleView(Mapping):
+    """
+    Read-only `people` mapping of degrees.py backed by a CompactGraph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        p = graph.person_index(person_id)
+        if p is None:
+            raise KeyError(person_id)
+        return {
+            "name": graph.person_names[p],
+            "birth": graph.person_births[p],
+            "movies": {graph.movie_ids[m] for m in graph.movies_of(p)},
+        }
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return self.graph.num_people
+
+    def __contains__(self, person_id):
+        return self.graph.person_index(person_id) is not None
+
+
+class MoviesView(Mapping):
+    """
+    Read-only `movies` mapping of degrees.py backed by a CompactGraph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        m = graph.movie_index(movie_id)
+        if m is None:
+            raise KeyError(movie_id)
+        return {
+            "title": graph.movie_titles[m],
+            "year": graph.movie_years[m],
+            "stars": {graph.person_ids[p] for p in graph.stars_of(m)},
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return self.graph.num_movies
+
+    def __contains__(self, movie_id):
+        return self.graph.movie_index(movie_id) is not None
+
+
+class NamesView(Mapping):
+    """
+    Read-only `names` mapping of degrees.py backed by a CompactGraph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        graph = self.graph
+        indices = graph.people_named(name)
+        if not indices:
+            raise KeyError(name)
+        return {graph.person_ids[p] for p in indices}
+
+    def __iter__(self):
+        previous = None
+        for name in self.graph.name_keys:
+            if name != previous:
+                yield name
+                previous = name
+        keys = self.graph.name_keys
+        for name in self.graph.added_names:
+            lo, hi = keys.find(name)
+            if lo == hi:
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def sorted_order(keys):
+    """
+    Returns an index buffer listing the positions of `keys` in sorted order.
+    """
+    return array(INDEX, sorted(range(len(keys)), key=keys.__getitem__))
+
+
+def build_csr(count, keys, values):
+    """
+    Groups `values` by `keys` (both in 0..count-1 index space) into CSR
+    offset and index buffers, dropping duplicate pairs.
+    """
+    offsets = array(INDEX, bytes(4 * (count + 1)))
+    for k in keys:
+        offsets[k + 1] += 1
+    for k in range(count):
+        offsets[k + 1] += offsets[k]
+
+    slots = array(INDEX, offsets)
+    grouped = array(INDEX, bytes(4 * len(keys)))
+    for k, v in zip(keys, values):
+        grouped[slots[k]] = v
+        slots[k] += 1
+
+    # Sort and deduplicate each row
+    indices = array(INDEX)
+    for k in range(count):
+        start = offsets[k]
+        offsets[k] = len(indices)
+        indices.extend(sorted(set(grouped[start:slots[k]])))
+    offsets[count] = len(indices)
+    return offsets, indices
+
+
+def transpose_csr(count, offsets, indices):
+    """
+    Returns the CSR buffers of the transposed relation, with `count` rows.
+    """
+    keys = array(INDEX, bytes(4 * len(indices)))
+    for row in range(len(offsets) - 1):
+        for i in range(offsets[row], offsets[row + 1]):
+            keys[i] = row
+    return build_csr(count, indices, keys)
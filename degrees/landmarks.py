@@ -0,0 +1,216 @@
+import math
+import sys
+from array import array
+from collections import deque
+
+import degrees
+
+# Number of landmarks picked by default
+LANDMARKS = 16
+
+# Largest value of each distance array typecode, which marks unreachable
+_MAXIMUM = {"B": 0xFF, "H": 0xFFFF}
+
+
+class LandmarkOracle():
+    """
+    Distance oracle over a CompactGraph that stores, for each of k landmark
+    people, the BFS distance from the landmark to every person.
+
+    By the triangle inequality, for any landmark l,
+    |d(l, s) - d(l, t)| <= d(s, t) <= d(l, s) + d(l, t),
+    which gives distance bounds in O(k) per pair (the ALT technique).
+
+    The oracle only answers bounds. Co-star graphs are small worlds, so
+    the lower bounds are too weak for A* guided by them to beat the
+    bidirectional BFS of degrees.shortest_path at finding exact paths.
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = landmarks
+
+        # One array per landmark, with the typecode's maximum for unreachable
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph=None, k=LANDMARKS):
+        """
+        Picks `k` landmarks and runs a BFS from each. The first landmark is
+        the person with the most movies; every next one is the reachable
+        person farthest from all landmarks picked so far.
+        """
+        if graph is None:
+            graph = degrees.compact_graph()
+        if graph.num_people == 0:
+            return cls(graph, [], [])
+
+        landmark = max(range(graph.num_people),
+                       key=lambda p: len(graph.movies_of(p)))
+        landmarks = []
+        distances = []
+        nearest = None
+        for _ in range(min(k, graph.num_people)):
+            depths = graph.bfs_tree(landmark)[2]
+            landmarks.append(landmark)
+            distances.append(pack(depths))
+
+            # Track each person's distance to the nearest landmark so far
+            if nearest is None:
+                nearest = depths
+            else:
+                nearest = array("i", map(_nearer, nearest, depths))
+            landmark = max(range(graph.num_people), key=nearest.__getitem__)
+            if nearest[landmark] <= 0:
+                break
+        return cls(graph, landmarks, distances)
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation
+        between the people `source` and `target`. Both are math.inf if
+        the landmarks prove them disconnected; `upper` is math.inf if no
+        landmark reaches them.
+        """
+        graph = self.graph
+        s = graph.person_index(source)
+        t = graph.person_index(target)
+        if source == target:
+            return 0, 0
+        if s is None or t is None:
+            return math.inf, math.inf
+        return self.index_bounds(s, t)
+
+    def index_bounds(self, s, t):
+        """
+        Returns bounds as `bounds` does, for dense person indices.
+        """
+        self._extend()
+        if s == t:
+            return 0, 0
+        lower = 1
+        upper = math.inf
+        for row in self.distances:
+            unreachable = _unreachable(row)
+            ds = row[s]
+            dt = row[t]
+            if ds == unreachable and dt == unreachable:
+                continue
+            if ds == unreachable or dt == unreachable:
+                return math.inf, math.inf
+            lower = max(lower, abs(ds - dt))
+            upper = min(upper, ds + dt)
+        return lower, upper
+
+    def star_added(self, person_id, movie_id, co_stars):
+        """
+        Repairs the landmark distances after `person_id` starred in
+        `movie_id` alongside `co_stars`. New edges can only shorten
+        distances, so only people whose distance drops are revisited.
+        """
+        graph = self.graph
+        if graph is not degrees.graph:
+            # Built from the dicts, so the new star is not in this copy yet
+            _mirror_star(graph, person_id, movie_id)
+        self._extend()
+        p = graph.person_index(person_id)
+        qs = [graph.person_index(q) for q in co_stars]
+        for k in range(len(self.distances)):
+            row = self.distances[k]
+            unreachable = _unreachable(row)
+
+            # Relax across the new edges, then propagate any decrease
+            changed = []
+            nearest = min((row[q] for q in qs if row[q] != unreachable),
+                          default=unreachable)
+            if nearest != unreachable and (row[p] == unreachable or row[p] > nearest + 1):
+                changed.append((p, nearest + 1))
+            elif row[p] != unreachable:
+                changed.extend((q, row[p] + 1) for q in qs
+                               if row[q] == unreachable or row[q] > row[p] + 1)
+
+            queue = deque()
+            for q, distance in changed:
+                row = self._set(k, q, distance)
+                queue.append(q)
+            while queue:
+                u = queue.popleft()
+                distance = row[u] + 1
+                for _, v in graph.neighbors(u):
+                    if row[v] == _unreachable(row) or row[v] > distance:
+                        row = self._set(k, v, distance)
+                        queue.append(v)
+
+    def _set(self, k, p, distance):
+        """
+        Sets a distance of landmark `k`, widening its array if the value
+        would collide with the unreachable marker. Returns the array.
+        """
+        row = self.distances[k]
+        if distance >= _unreachable(row):
+            row = self.distances[k] = array(
+                "H", (0xFFFF if d == 0xFF else d for d in row)
+            )
+        row[p] = distance
+        return row
+
+    def _extend(self):
+        """
+        Marks people added to the graph since the BFS as unreachable.
+        """
+        for row in self.distances:
+            missing = self.graph.num_people - len(row)
+            if missing > 0:
+                row.extend([_unreachable(row)] * missing)
+
+
+def _mirror_star(graph, person_id, movie_id):
+    p = graph.person_index(person_id)
+    if p is None:
+        person = degrees.people[person_id]
+        p = graph.add_person(person_id, person["name"], person["birth"])
+    m = graph.movie_index(movie_id)
+    if m is None:
+        movie = degrees.movies[movie_id]
+        m = graph.add_movie(movie_id, movie["title"], movie["year"])
+    graph.add_star(p, m)
+
+
+def pack(depths):
+    """
+    Packs BFS depths (-1 for unreachable) into the smallest unsigned
+    array that holds them, with its maximum value meaning unreachable.
+    """
+    typecode = "B" if max(depths, default=0) < 0xFF else "H"
+    unreachable = _MAXIMUM[typecode]
+    return array(typecode, (unreachable if d < 0 else d for d in depths))
+
+
+def _unreachable(row):
+    return _MAXIMUM[row.typecode]
+
+
+def _nearer(a, b):
+    if a < 0:
+        return b
+    if b < 0:
+        return a
+    return min(a, b)
+
+
+def main():
+    if len(sys.argv) != 4:
+        sys.exit("Usage: python landmarks.py directory source_id target_id")
+
+    print("Loading data...")
+    degrees.load_data(sys.argv[1], compact=True)
+    print("Picking landmarks...")
+    oracle = LandmarkOracle.build()
+    lower, upper = oracle.bounds(sys.argv[2], sys.argv[3])
+    print(f"Between {lower} and {upper} degrees of separation.")
+    path = degrees.shortest_path(sys.argv[2], sys.argv[3], bidirectional=True)
+    print("Not connected." if path is None else f"Exactly {len(path)}.")
+
+
+if __name__ == "__main__":
+    main()
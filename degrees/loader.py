@@ -0,0 +1,271 @@
+import csv
+import io
+import multiprocessing
+import os
+from array import array
+
+from graph import INDEX, CompactGraph, build_csr
+
+# Columns kept from each CSV file, in the order rows are returned
+COLUMNS = {
+    "people.csv": ("id", "name", "birth"),
+    "movies.csv": ("id", "title", "year"),
+    "stars.csv": ("person_id", "movie_id"),
+}
+
+# Files smaller than this many bytes per chunk are not split further
+MIN_CHUNK = 1 << 20
+
+# Indexes of the people and movies loaded so far, their numbers, and the
+# numbers of ranges of people and of movies that stars are grouped into,
+# shared with the workers that parse stars by forking
+_people = None
+_movies = None
+_counts = None
+_buckets = None
+
+
+def chunk_ranges(path, chunks):
+    """
+    Splits the body of the CSV file at `path` into at most `chunks`
+    (start, end) byte ranges, each beginning at the start of a record,
+    so that quoted fields holding newlines are never split.
+    Returns the header line and the ranges.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.readline()
+        body = f.tell()
+        chunks = max(1, min(chunks, (size - body) // MIN_CHUNK))
+
+        # Move every split point forward to just after the next newline
+        # that ends a record: one outside quotes, where the number of
+        # quote characters read so far is even
+        bounds = [body]
+        quoted = False
+        for i in range(1, chunks):
+            split = max(body + (size - body) * i // chunks - 1, bounds[-1])
+            f.seek(bounds[-1])
+            quoted ^= f.read(split - bounds[-1]).count(b'"') % 2 == 1
+            line = f.readline()
+            quoted ^= line.count(b'"') % 2 == 1
+            while quoted and line:
+                line = f.readline()
+                quoted ^= line.count(b'"') % 2 == 1
+            if f.tell() >= size:
+                break
+            if f.tell() > bounds[-1]:
+                bounds.append(f.tell())
+        bounds.append(size)
+
+    header = next(csv.reader([header.decode("utf-8")]))
+    return header, list(zip(bounds, bounds[1:]))
+
+
+def parse_chunk(task):
+    """
+    Parses the lines of `path` between byte offsets `start` and `end`,
+    returning a list of tuples holding the fields at `positions`.
+    """
+    path, start, end, positions = task
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+    return [
+        tuple(row[i] for i in positions)
+        for row in csv.reader(io.StringIO(text, newline=""))
+        if row
+    ]
+
+
+def tasks(directory, filename, workers):
+    """
+    Returns the parse_chunk tasks of one CSV file in `directory`, about
+    four per worker.
+    """
+    path = os.path.join(directory, filename)
+    header, ranges = chunk_ranges(path, 4 * workers)
+    positions = [header.index(column) for column in COLUMNS[filename]]
+    return [(path, start, end, positions) for start, end in ranges]
+
+
+def parse_people(task):
+    """
+    Returns partial `people` and `names` dicts of one people.csv chunk.
+    """
+    people = {}
+    names = {}
+    for person_id, name, birth in parse_chunk(task):
+        people[person_id] = {"name": name, "birth": birth, "movies": set()}
+        names.setdefault(name.lower(), set()).add(person_id)
+    return people, names
+
+
+def parse_movies(task):
+    """
+    Returns a partial `movies` dict of one movies.csv chunk.
+    """
+    return {
+        movie_id: {"title": title, "year": year, "stars": set()}
+        for movie_id, title, year in parse_chunk(task)
+    }
+
+
+def parse_edges(task):
+    """
+    Returns the stars of one stars.csv chunk as (keys, values) pairs of
+    dense index arrays, as bytes: one pair per range of people, keyed by
+    person, then one per range of movies, keyed by movie. Also returns
+    the number of rows dropped for an unknown ID.
+    """
+    person_buckets, movie_buckets = _buckets
+    num_people, num_movies = _counts
+    by_person = [(array(INDEX), array(INDEX)) for _ in range(person_buckets)]
+    by_movie = [(array(INDEX), array(INDEX)) for _ in range(movie_buckets)]
+    dropped = 0
+    for person_id, movie_id in parse_chunk(task):
+        p = _people.get(person_id)
+        m = _movies.get(movie_id)
+        if p is None or m is None:
+            dropped += 1
+            continue
+        keys, values = by_person[p * person_buckets // num_people]
+        keys.append(p)
+        values.append(m)
+        if movie_buckets:
+            keys, values = by_movie[m * movie_buckets // num_movies]
+            keys.append(m)
+            values.append(p)
+    return (
+        [(keys.tobytes(), values.tobytes()) for keys, values in by_person],
+        [(keys.tobytes(), values.tobytes()) for keys, values in by_movie],
+        dropped,
+    )
+
+
+def build_part(task):
+    """
+    Returns the CSR buffers, as bytes, of the `count` keys starting at
+    `lo`, from the (keys, values) pairs of one range.
+    """
+    count, lo, keys, values = task
+    keys = array(INDEX, keys)
+    offsets, indices = build_csr(count, array(INDEX, (k - lo for k in keys)),
+                                 array(INDEX, values))
+    return offsets.tobytes(), indices.tobytes()
+
+
+def load_into(directory, people, movies, names, workers):
+    """
+    Fills the `people`, `movies` and `names` dicts of degrees.py from the
+    CSV files in `directory`, parsed in parallel by `workers` processes.
+
+    Workers build the dicts of their people and movies chunks, which the
+    parent merges with one update per chunk. Workers forked after that
+    turn star rows into dense index arrays, which the parent adds to the
+    sets of movies and stars without looking up any ID.
+
+    Returns the number of star rows dropped because they refer to an
+    unknown person or movie.
+    """
+    context = multiprocessing.get_context("fork")
+    with context.Pool(workers) as pool:
+        for part, part_names in pool.imap(parse_people, tasks(directory, "people.csv", workers)):
+            people.update(part)
+            for name in part_names.keys() & names.keys():
+                part_names[name] |= names[name]
+            names.update(part_names)
+        for part in pool.imap(parse_movies, tasks(directory, "movies.csv", workers)):
+            movies.update(part)
+
+    person_ids = list(people)
+    movie_ids = list(movies)
+    movies_of = [people[person_id]["movies"] for person_id in person_ids]
+    stars_of = [movies[movie_id]["stars"] for movie_id in movie_ids]
+    by_person, _, dropped = _edges(directory, person_ids, movie_ids, workers, (1, 0))
+    keys, values = by_person[0]
+    for p, m in zip(array(INDEX, keys), array(INDEX, values)):
+        movies_of[p].add(movie_ids[m])
+        stars_of[m].add(person_ids[p])
+    return dropped
+
+
+def read_graph(directory, workers):
+    """
+    Returns a CompactGraph of the CSV files in `directory`, parsed in
+    parallel by `workers` processes.
+
+    Workers forked after the people and movies are read turn star rows
+    into dense index arrays grouped by ranges of people and of movies.
+    Each range's CSR buffers are then built by a worker, and the parent
+    only joins them.
+    """
+    context = multiprocessing.get_context("fork")
+    with context.Pool(workers) as pool:
+        people_rows = [row for rows in pool.imap(
+            parse_chunk, tasks(directory, "people.csv", workers)) for row in rows]
+        movie_rows = [row for rows in pool.imap(
+            parse_chunk, tasks(directory, "movies.csv", workers)) for row in rows]
+
+    by_person, by_movie, dropped = _edges(
+        directory, [row[0] for row in people_rows], [row[0] for row in movie_rows],
+        workers, (workers, workers)
+    )
+    with context.Pool(workers) as pool:
+        person_offsets, person_movies = _join(pool, len(people_rows), by_person)
+        movie_offsets, movie_stars = _join(pool, len(movie_rows), by_movie)
+    return CompactGraph.from_csr(people_rows, movie_rows, person_offsets, person_movies,
+                                 movie_offsets, movie_stars, dropped)
+
+
+def _edges(directory, person_ids, movie_ids, workers, buckets):
+    """
+    Parses stars.csv with a pool of `workers` processes, forked to share
+    the indices of `person_ids` and `movie_ids`, grouping stars into
+    `buckets` ranges of people and of movies.
+
+    Returns the (keys, values) bytes of every range of people and of
+    movies, and the number of rows dropped.
+    """
+    global _people, _movies, _counts, _buckets
+    _people = {person_id: i for i, person_id in enumerate(person_ids)}
+    _movies = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+    _counts = len(person_ids), len(movie_ids)
+    _buckets = buckets
+    by_person = [([], []) for _ in range(buckets[0])]
+    by_movie = [([], []) for _ in range(buckets[1])]
+    dropped = 0
+    context = multiprocessing.get_context("fork")
+    try:
+        with context.Pool(workers) as pool:
+            for part_people, part_movies, part_dropped in pool.imap(
+                parse_edges, tasks(directory, "stars.csv", workers)
+            ):
+                for parts, part in zip(by_person + by_movie, part_people + part_movies):
+                    parts[0].append(part[0])
+                    parts[1].append(part[1])
+                dropped += part_dropped
+    finally:
+        _people = _movies = _counts = _buckets = None
+    return ([(b"".join(keys), b"".join(values)) for keys, values in by_person],
+            [(b"".join(keys), b"".join(values)) for keys, values in by_movie],
+            dropped)
+
+
+def _join(pool, count, ranges):
+    """
+    Builds the CSR buffers of `count` keys from the (keys, values) bytes
+    of equal ranges of keys, one range per task of `pool`.
+    """
+    bounds = [-(-i * count // len(ranges)) for i in range(len(ranges) + 1)]
+    parts = pool.map(build_part, [
+        (hi - lo, lo, keys, values)
+        for lo, hi, (keys, values) in zip(bounds, bounds[1:], ranges)
+    ])
+    offsets = array(INDEX, [0])
+    indices = array(INDEX)
+    for part_offsets, part_indices in parts:
+        base = len(indices)
+        offsets.extend(base + offset for offset in array(INDEX, part_offsets)[1:])
+        indices.frombytes(part_indices)
+    return offsets, indices
@@ -0,0 +1,291 @@
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Sequence
+
+# Candidate sets up to this size are ranked by a direct scan; larger ones
+# use the range-maximum tree, which is built on first use. Each count read
+# in a scan is a Python call, so a scan of 4096 took 3 ms on 100k names
+SCAN_LIMIT = 256
+
+
+class Mapped(Sequence):
+    """
+    Read-only sequence whose i-th item is `function(i)`.
+    """
+
+    def __init__(self, length, function):
+        self.length = length
+        self.function = function
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.length:
+            raise IndexError(i)
+        return self.function(i)
+
+
+class NameIndex():
+    """
+    Autocomplete index over lowercased person names, kept in sorted order.
+
+    The sorted keys act as an implicit trie: the names sharing a prefix
+    form a contiguous range, and the children of a range are found by
+    bisection. Matches are ranked by number of movies, using a tree of
+    range maxima so that the best few of a large range are found without
+    scanning it.
+
+    People added later go into a small sorted list of their own, searched
+    alongside the main keys; `count_of` gives their number of movies.
+    """
+
+    def __init__(self, keys, person_ids, counts, count_of=None):
+        self.keys = keys
+        self.person_ids = person_ids
+        self.counts = counts
+        self.count_of = count_of
+        self.added = []
+        self._tree = None
+        self._extra = None
+
+    @classmethod
+    def from_dicts(cls, people, names):
+        """
+        Builds an index over the `people` and `names` dicts of degrees.py.
+        """
+        keys = []
+        person_ids = []
+        for name in sorted(names):
+            for person_id in sorted(names[name]):
+                keys.append(name)
+                person_ids.append(person_id)
+
+        def count_of(person_id):
+            return len(people[person_id]["movies"])
+
+        counts = Mapped(len(keys), lambda i: count_of(person_ids[i]))
+        return cls(keys, person_ids, counts, count_of)
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Builds an index that reads names and movie counts straight from
+        the sorted name order of a CompactGraph, without copying them.
+        """
+        order = graph.name_order
+
+        def count(i):
+            return len(graph.movies_of(order[i]))
+
+        def count_of(person_id):
+            return len(graph.movies_of(graph.person_index(person_id)))
+
+        return cls(
+            graph.name_keys,
+            Mapped(len(order), lambda i: graph.person_ids[order[i]]),
+            Mapped(len(order), count),
+            count_of,
+        )
+
+    def add(self, person_id, name):
+        """
+        Adds a person loaded after the index was built.
+        """
+        insort(self.added, (name.lower(), person_id))
+        self._extra = None
+
+    def touch(self, person_id, name):
+        """
+        Refreshes the ranking of a person whose number of movies changed.
+        """
+        key = name.lower()
+        for i in range(bisect_left(self.keys, key), bisect_right(self.keys, key)):
+            if self.person_ids[i] == person_id:
+                self._update(i)
+                return
+        self._extra = None
+
+    def prefix(self, text, limit=10):
+        """
+        Returns up to `limit` person_ids whose name starts with `text`,
+        most movies first.
+        """
+        return self.search(text, limit=limit)
+
+    def fuzzy(self, text, max_edits=1, limit=10):
+        """
+        Returns up to `limit` person_ids whose whole name is within
+        `max_edits` insertions, deletions or substitutions of `text`,
+        most movies first.
+        """
+        return self.search(text, max_edits=max_edits, prefix=False, limit=limit)
+
+    def search(self, text, max_edits=0, prefix=True, limit=10):
+        """
+        Returns up to `limit` person_ids, most movies first, whose name is
+        within `max_edits` edits of `text` or, if `prefix` is true, starts
+        with a string within `max_edits` edits of `text`.
+        """
+        text = text.lower()
+        if max_edits == 0:
+            lo = bisect_left(self.keys, text)
+            hi = bisect_right(self.keys, text) if not prefix else \
+                self._prefix_end(text, lo, len(self.keys))
+            ranges = [(lo, hi)] if lo < hi else []
+        else:
+            ranges = self._edit_ranges(text, max_edits, prefix)
+        matches = [(self.counts[i], self.person_ids[i])
+                   for i in self._top(ranges, limit)]
+
+        if self.added:
+            if self._extra is None:
+                self._extra = NameIndex(
+                    [key for key, _ in self.added],
+                    [person_id for _, person_id in self.added],
+                    [self.count_of(person_id) for _, person_id in self.added],
+                )
+            matches.extend(
+                (self.count_of(person_id), person_id) for person_id
+                in self._extra.search(text, max_edits, prefix, limit)
+            )
+            matches.sort(key=lambda match: -match[0])
+        return [person_id for _, person_id in matches[:limit]]
+
+    def _prefix_end(self, text, lo, hi):
+        """
+        Returns the end of the range of keys starting with `text`.
+        """
+        if not text:
+            return hi
+        upper = text[:-1] + chr(ord(text[-1]) + 1)
+        return bisect_left(self.keys, upper, lo, hi)
+
+    def _edit_ranges(self, text, max_edits, prefix):
+        """
+        Walks the implicit trie, carrying one row of the Levenshtein table
+        per prefix, and returns the key ranges that match. Subtrees whose
+        row minimum exceeds `max_edits` cannot match and are skipped.
+
+        Row entries are capped at `max_edits + 1`, and at depth d only the
+        band of columns d - max_edits to d + max_edits can be within the
+        bound, so each step only updates those columns.
+        """
+        keys = self.keys
+        length = len(text)
+        cap = max_edits + 1
+        ranges = []
+        stack = [(0, len(keys), "", [min(j, cap) for j in range(length + 1)])]
+        while stack:
+            lo, hi, stem, row = stack.pop()
+            if prefix and row[length] <= max_edits:
+                # `text` is close to `stem`, so every name below matches
+                ranges.append((lo, hi))
+                continue
+
+            # Names equal to the stem sort first in the range
+            depth = len(stem)
+            position = bisect_right(keys, stem, lo, hi)
+            if position > lo and row[length] <= max_edits:
+                ranges.append((lo, position))
+
+            while position < hi:
+                character = keys[position][depth]
+                child = stem + character
+                end = self._prefix_end(child, position, hi)
+                next_row = [cap] * (length + 1)
+                next_row[0] = min(depth + 1, cap)
+                first = max(1, depth + 1 - max_edits)
+                last = min(length, depth + 1 + max_edits)
+                for j in range(first, last + 1):
+                    next_row[j] = min(
+                        next_row[j - 1] + 1,
+                        row[j] + 1,
+                        row[j - 1] + (text[j - 1] != character),
+                        cap,
+                    )
+                if min(next_row) <= max_edits:
+                    stack.append((position, end, child, next_row))
+                position = end
+        return ranges
+
+    def _top(self, ranges, limit):
+        """
+        Returns the positions of the `limit` largest counts in `ranges`,
+        largest first and ties in name order.
+        """
+        counts = self.counts
+        if sum(hi - lo for lo, hi in ranges) <= SCAN_LIMIT:
+            positions = (i for lo, hi in ranges for i in range(lo, hi))
+            return heapq.nlargest(limit, positions, key=lambda i: (counts[i], -i))
+
+        # Repeatedly take the best of some range, then split it around that
+        heap = []
+        for lo, hi in ranges:
+            self._push(heap, lo, hi)
+        positions = []
+        while heap and len(positions) < limit:
+            _, i, lo, hi = heapq.heappop(heap)
+            positions.append(i)
+            self._push(heap, lo, i)
+            self._push(heap, i + 1, hi)
+        return positions
+
+    def _push(self, heap, lo, hi):
+        if lo < hi:
+            i = self._argmax(lo, hi)
+            heapq.heappush(heap, (-self.counts[i], i, lo, hi))
+
+    def _argmax(self, lo, hi):
+        """
+        Returns the position of the largest count in [lo, hi), the
+        earliest on ties, from a bottom-up tree of range maxima.
+        """
+        tree = self._tree
+        if tree is None:
+            tree = self._tree = self._build_tree()
+        counts = self.counts
+        size = len(counts)
+        best = -1
+        lo += size
+        hi += size
+        while lo < hi:
+            if lo & 1:
+                best = _better(counts, best, tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best = _better(counts, best, tree[hi])
+            lo >>= 1
+            hi >>= 1
+        return best
+
+    def _update(self, i):
+        """
+        Recomputes the range maxima above position `i` after its count changed.
+        """
+        tree = self._tree
+        if tree is None:
+            return
+        counts = self.counts
+        node = (i + len(counts)) >> 1
+        while node:
+            tree[node] = _better(counts, tree[2 * node], tree[2 * node + 1])
+            node >>= 1
+
+    def _build_tree(self):
+        counts = self.counts
+        size = len(counts)
+        tree = array("i", bytes(4 * size)) + array("i", range(size))
+        for node in range(size - 1, 0, -1):
+            tree[node] = _better(counts, tree[2 * node], tree[2 * node + 1])
+        return tree
+
+
+def _better(counts, i, j):
+    if i < 0:
+        return j
+    if counts[j] > counts[i] or (counts[j] == counts[i] and j < i):
+        return j
+    return i
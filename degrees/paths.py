@@ -0,0 +1,130 @@
+import heapq
+import itertools
+
+import degrees
+
+
+def shortest_dag(source, target, banned_people=(), banned_steps=()):
+    """
+    Runs a BFS from `source` that stops after the level containing
+    `target`, skipping people in `banned_people` and (person_id, movie_id,
+    person_id) steps in `banned_steps`.
+
+    Returns a dict mapping each person reached before or at the target's
+    level to every (movie_id, parent_id) step that reaches them on a
+    shortest path, or None if the target is not reachable.
+    """
+    if source == target:
+        return {source: []}
+
+    parents = {source: []}
+    frontier = [source]
+    while frontier:
+        level = {}
+        for parent in frontier:
+            for movie_id, person_id in degrees.neighbors_for_person(parent):
+                if person_id in parents or person_id in banned_people:
+                    continue
+                if (parent, movie_id, person_id) in banned_steps:
+                    continue
+                level.setdefault(person_id, []).append((movie_id, parent))
+        parents.update(level)
+        if target in level:
+            return parents
+        frontier = list(level)
+    return None
+
+
+def all_shortest_paths(source, target):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs that connect
+    the source to the target, where two paths differ if they pass through
+    different people or movies.
+
+    One BFS records the predecessors of each person; paths are then
+    spelled out lazily by a depth-first walk back from the target, so that
+    stopping early skips the rest of the enumeration.
+    """
+    if source == target:
+        yield []
+        return
+    parents = shortest_dag(source, target)
+    if parents is None:
+        return
+
+    # Stack of (person_id, path from person_id to the target, step iterator)
+    stack = [(target, [], iter(parents[target]))]
+    while stack:
+        person_id, suffix, steps = stack[-1]
+        step = next(steps, None)
+        if step is None:
+            stack.pop()
+            continue
+        movie_id, parent = step
+        path = [(movie_id, person_id)] + suffix
+        if parent == source:
+            yield path
+        else:
+            stack.append((parent, path, iter(parents[parent])))
+
+
+def k_shortest_paths(source, target, k=None):
+    """
+    Yields the loopless lists of (movie_id, person_id) pairs that connect
+    the source to the target in order of length, up to `k` of them if
+    given, using Yen's algorithm.
+
+    Each next path is found by deviating from the paths already yielded;
+    nothing beyond the next path is computed until it is requested.
+    """
+    if k is not None and k <= 0:
+        return
+    first = next(all_shortest_paths(source, target), None)
+    if first is None:
+        return
+    found = [first]
+    yield first
+
+    # Heap of (length, tie-breaker, path) candidates not yet yielded
+    candidates = []
+    seen = {tuple(first)}
+    counter = itertools.count()
+    while k is None or len(found) < k:
+        previous = [(None, source)] + found[-1]
+        for i in range(len(previous) - 1):
+            spur = previous[i][1]
+            root = found[-1][:i]
+
+            # Steps leaving the root that an earlier path already used
+            banned_steps = {
+                (spur,) + path[i] for path in found
+                if path[:i] == root and len(path) > i
+            }
+            banned_people = {person_id for _, person_id in root} | {source}
+            banned_people.discard(spur)
+
+            parents = shortest_dag(spur, target, banned_people, banned_steps)
+            if parents is None:
+                continue
+            spur_path = _first_path(parents, spur, target)
+            path = root + spur_path
+            if tuple(path) not in seen:
+                seen.add(tuple(path))
+                heapq.heappush(candidates, (len(path), next(counter), path))
+
+        if not candidates:
+            return
+        _, _, path = heapq.heappop(candidates)
+        found.append(path)
+        yield path
+
+
+def _first_path(parents, source, target):
+    solution = []
+    person_id = target
+    while person_id != source:
+        movie_id, parent = parents[person_id][0]
+        solution.append((movie_id, person_id))
+        person_id = parent
+    solution.reverse()
+    return solution
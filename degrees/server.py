@@ -0,0 +1,208 @@
+import asyncio
+import json
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import degrees
+
+# Largest number of edits and of results a /complete request may ask for
+MAX_EDITS = 2
+MAX_LIMIT = 100
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def search(source, target):
+    """
+    Runs one shortest-path search; executed in a worker process.
+    """
+    return degrees.shortest_path(source, target, bidirectional=True)
+
+
+def complete(text, edits, limit):
+    """
+    Runs one fuzzy name search; executed in a worker process.
+    """
+    return degrees.name_index.search(text, max_edits=edits, limit=limit)
+
+
+def person(person_id):
+    """
+    Returns the JSON description of a person, or raises a 404 HTTPError.
+    """
+    if person_id not in degrees.people:
+        raise HTTPError(HTTPStatus.NOT_FOUND, f"person not found: {person_id}")
+    record = degrees.people[person_id]
+    return {"id": person_id, "name": record["name"], "birth": record["birth"]}
+
+
+class Server():
+    """
+    HTTP/JSON service answering queries over the data loaded by
+    degrees.load_data. Searches run in `executor` so that the event
+    loop keeps serving other requests meanwhile.
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+        self.routes = {
+            "/path": self.path,
+            "/people": self.people,
+            "/neighbors": self.neighbors,
+            "/complete": self.complete,
+        }
+
+    async def path(self, query):
+        source = person(self.param(query, "source"))["id"]
+        target = person(self.param(query, "target"))["id"]
+        loop = asyncio.get_running_loop()
+        path = await loop.run_in_executor(self.executor, search, source, target)
+        if path is None:
+            return {"source": source, "target": target,
+                    "degrees": None, "path": None}
+        return {
+            "source": source,
+            "target": target,
+            "degrees": len(path),
+            "path": [{"movie_id": movie_id, "person_id": person_id}
+                     for movie_id, person_id in path],
+        }
+
+    async def people(self, query):
+        name = self.param(query, "name")
+        person_ids = sorted(degrees.names.get(name.lower(), set()))
+        return {"name": name, "people": [person(i) for i in person_ids]}
+
+    async def complete(self, query):
+        text = self.param(query, "q")
+        try:
+            limit = int(query.get("limit", ["10"])[0])
+            edits = int(query.get("edits", ["0"])[0])
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "limit and edits must be integers")
+        if not 0 <= edits <= MAX_EDITS or not 0 < limit <= MAX_LIMIT:
+            raise HTTPError(HTTPStatus.BAD_REQUEST,
+                            f"edits must be 0 to {MAX_EDITS} and limit 1 to {MAX_LIMIT}")
+        if edits:
+            # Fuzzy searches take milliseconds, so they leave the event loop
+            loop = asyncio.get_running_loop()
+            person_ids = await loop.run_in_executor(self.executor, complete, text, edits, limit)
+        else:
+            person_ids = complete(text, edits, limit)
+        return {"q": text, "people": [person(i) for i in person_ids]}
+
+    async def neighbors(self, query):
+        person_id = person(self.param(query, "id"))["id"]
+        return {
+            "id": person_id,
+            "neighbors": [
+                {"movie_id": movie_id, "person_id": neighbor_id}
+                for movie_id, neighbor_id
+                in sorted(degrees.neighbors_for_person(person_id))
+                if neighbor_id != person_id
+            ],
+        }
+
+    @staticmethod
+    def param(query, name):
+        values = query.get(name)
+        if not values:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"missing parameter: {name}")
+        return values[0]
+
+    async def handle(self, reader, writer):
+        """
+        Serves one request per connection.
+        """
+        try:
+            status, body = await self.respond(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+
+        payload = json.dumps(body).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "Connection: close\r\n\r\n".encode("latin-1") + payload
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def respond(self, reader):
+        """
+        Reads a request and returns its (status, JSON body).
+        """
+        request = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+
+        try:
+            method, target, _ = request.decode("latin-1").split(" ", 2)
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {"error": "malformed request"}
+        if method != "GET":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "only GET is allowed"}
+
+        url = urlsplit(target)
+        route = self.routes.get(url.path)
+        if route is None:
+            return HTTPStatus.NOT_FOUND, {"error": f"no such endpoint: {url.path}"}
+        try:
+            return HTTPStatus.OK, await route(parse_qs(url.query))
+        except HTTPError as e:
+            return e.status, {"error": str(e)}
+
+
+async def serve(host, port, workers):
+    # Fork the workers after loading so that they share the loaded graph
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(workers, mp_context=context) as executor:
+        # The pool forks on its first task; run a no-op now so that the
+        # workers do not inherit the listening socket or a client's
+        await asyncio.get_running_loop().run_in_executor(executor, int)
+        server = Server(executor)
+        listener = await asyncio.start_server(server.handle, host, port)
+        print(f"Serving on http://{host}:{port}", file=sys.stderr)
+        async with listener:
+            await listener.serve_forever()
+
+
+def main():
+    args = sys.argv[1:]
+    compact = "--compact" in args
+    if compact:
+        args.remove("--compact")
+    options = {"--host": "127.0.0.1", "--port": "8000", "--workers": None}
+    for option in options:
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+    if len(args) != 1:
+        sys.exit("Usage: python server.py [--compact] [--host HOST] "
+                 "[--port PORT] [--workers N] directory")
+    workers = options["--workers"] and int(options["--workers"])
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args[0], compact=compact)
+    print("Data loaded.", file=sys.stderr)
+
+    try:
+        asyncio.run(serve(options["--host"], int(options["--port"]), workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
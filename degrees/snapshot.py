@@ -0,0 +1,134 @@
+import mmap
+import os
+import struct
+import sys
+
+from graph import CompactGraph, StringTable
+
+# File written next to the CSVs by `python snapshot.py directory`
+FILENAME = "degrees.snapshot"
+
+MAGIC = b"DEGSNAP2"
+
+# String tables and index buffers of a CompactGraph, in file order
+TABLES = ["person_ids", "person_names", "person_births",
+          "movie_ids", "movie_titles", "movie_years"]
+BUFFERS = ["person_offsets", "person_movies", "movie_offsets", "movie_stars",
+           "person_order", "movie_order", "name_order"]
+
+# Header: magic, byte order flag, number of star rows dropped while
+# loading the CSVs, then (offset, length) of every section
+HEADER = struct.Struct(f"<8sQQ{2 * (2 * len(TABLES) + len(BUFFERS))}Q")
+BYTEORDER = 1 if sys.byteorder == "little" else 2
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, FILENAME)
+
+
+def is_fresh(directory):
+    """
+    Returns True if `directory` has a snapshot that is newer
+    than all of its CSV files.
+    """
+    try:
+        built = os.path.getmtime(snapshot_path(directory))
+        return all(
+            os.path.getmtime(os.path.join(directory, name)) <= built
+            for name in ("people.csv", "movies.csv", "stars.csv")
+        )
+    except OSError:
+        return False
+
+
+def write_snapshot(graph, path):
+    """
+    Writes `graph` to `path` as a flat binary file whose buffers
+    can be memory-mapped back by `read_snapshot`, along with its
+    count of dropped star rows.
+    """
+    dropped = graph.dropped
+    if graph.has_updates:
+        graph = graph.rebuilt()
+
+    sections = []
+    for name in TABLES:
+        table = getattr(graph, name)
+        sections.append(memoryview(table.offsets).cast("B"))
+        sections.append(memoryview(table.data).cast("B"))
+    for name in BUFFERS:
+        sections.append(memoryview(getattr(graph, name)).cast("B"))
+
+    # Lay sections out after the header, each aligned to 8 bytes
+    layout = []
+    position = _align(HEADER.size)
+    for section in sections:
+        layout.extend((position, section.nbytes))
+        position = _align(position + section.nbytes)
+
+    # Write to a temporary file first so readers never see a partial snapshot
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(HEADER.pack(MAGIC, BYTEORDER, dropped, *layout))
+        for section, offset in zip(sections, layout[::2]):
+            f.write(bytes(offset - f.tell()))
+            f.write(section)
+    os.replace(temporary, path)
+
+
+def read_snapshot(path):
+    """
+    Memory-maps the snapshot at `path` and returns a CompactGraph whose
+    buffers point straight into the mapping, so that pages are loaded on
+    demand and shared between processes reading the same file.
+    """
+    with open(path, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mapping) < HEADER.size:
+        raise ValueError(f"{path} is not a degrees snapshot")
+    magic, byteorder, dropped, *layout = HEADER.unpack_from(mapping)
+    if magic != MAGIC or byteorder != BYTEORDER:
+        raise ValueError(f"{path} is not a degrees snapshot for this version "
+                         "and machine; rebuild it with snapshot.py")
+
+    view = memoryview(mapping)
+    sections = [
+        view[offset:offset + length]
+        for offset, length in zip(layout[::2], layout[1::2])
+    ]
+    tables = [
+        StringTable(sections[2 * i].cast("i"), sections[2 * i + 1])
+        for i in range(len(TABLES))
+    ]
+    buffers = [section.cast("i") for section in sections[2 * len(TABLES):]]
+    graph = CompactGraph(*tables, *buffers)
+    graph.dropped = dropped
+    return graph
+
+
+def build(directory):
+    """
+    Loads the CSVs in `directory` and writes their snapshot beside them.
+    """
+    graph = CompactGraph.from_csv(directory)
+    write_snapshot(graph, snapshot_path(directory))
+    return graph
+
+
+def _align(position):
+    return (position + 7) & ~7
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python snapshot.py directory")
+    directory = sys.argv[1]
+
+    print("Building snapshot...")
+    graph = build(directory)
+    print(f"Wrote {snapshot_path(directory)} "
+          f"({graph.num_people} people, {graph.num_movies} movies).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+
+# Serve the small dataset on a free port
+with socket.socket() as s:
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+directory = os.path.dirname(os.path.abspath(__file__))
+server = subprocess.Popen(
+    [sys.executable, "server.py", "--workers", "2", "--port", str(port), "small"],
+    cwd=directory, stderr=subprocess.PIPE, text=True,
+)
+while "Serving on" not in server.stderr.readline():
+    pass
+
+
+def get(target):
+    """
+    Sends one GET request and reads the response until the server closes
+    the connection, failing with socket.timeout if it never does.
+    """
+    with socket.create_connection(("127.0.0.1", port), timeout=10) as conn:
+        conn.sendall(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        response = b""
+        while chunk := conn.recv(4096):
+            response += chunk
+    return response
+
+
+try:
+    # Both responses must end: no worker may hold a client socket open
+    for _ in range(2):
+        response = get("/path?source=102&target=129")
+        print("Reached EOF:", response.split(b"\r\n\r\n", 1)[1].decode())
+finally:
+    # Interrupt rather than kill the server, so that it shuts its pool down
+    server.send_signal(signal.SIGINT)
+    server.wait()
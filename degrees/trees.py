@@ -0,0 +1,169 @@
+import math
+from collections import OrderedDict, namedtuple
+
+import degrees
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class BFSTree():
+    """
+    Complete BFS parent tree from `source`, mapping every reachable
+    person_id to the (movie_id, parent_id) step that first reached it.
+    """
+
+    def __init__(self, source, parents, depths):
+        self.source = source
+        self.parents = parents
+        self.depths = depths
+
+    def distance(self, target):
+        """
+        Returns the degrees of separation from the source to `target`,
+        or None if they are not connected.
+        """
+        return self.depths.get(target)
+
+    def path_to(self, target):
+        """
+        Returns the list of (movie_id, person_id) pairs that connect the
+        source to `target`, or None if they are not connected.
+        """
+        if target not in self.depths:
+            return None
+        solution = []
+        while target != self.source:
+            movie_id, parent = self.parents[target]
+            solution.append((movie_id, target))
+            target = parent
+        solution.reverse()
+        return solution
+
+
+class CompactTree():
+    """
+    Complete BFS parent tree from `source` over a CompactGraph,
+    with the same interface as BFSTree.
+    """
+
+    def __init__(self, graph, source):
+        self.graph = graph
+        self.source = source
+        self.parents, self.via, self.depths = graph.bfs_tree(
+            graph.person_index(source)
+        )
+
+    def distance(self, target):
+        p = self.graph.person_index(target)
+        if p is None or p >= len(self.depths) or self.depths[p] == -1:
+            return None
+        return self.depths[p]
+
+    def path_to(self, target):
+        graph = self.graph
+        p = graph.person_index(target)
+        if p is None or p >= len(self.depths) or self.depths[p] == -1:
+            return None
+        solution = []
+        while self.depths[p] > 0:
+            solution.append((graph.movie_ids[self.via[p]], graph.person_ids[p]))
+            p = self.parents[p]
+        solution.reverse()
+        return solution
+
+
+def bfs_tree(source):
+    """
+    Returns the complete BFS tree from `source` over the loaded data.
+    """
+    if degrees.graph is not None:
+        return CompactTree(degrees.graph, source)
+
+    parents = {}
+    depths = {source: 0}
+    frontier = [source]
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for parent in frontier:
+            for movie_id, person_id in degrees.neighbors_for_person(parent):
+                if person_id not in depths:
+                    depths[person_id] = depth
+                    parents[person_id] = (movie_id, parent)
+                    next_frontier.append(person_id)
+        frontier = next_frontier
+    return BFSTree(source, parents, depths)
+
+
+class TreeCache():
+    """
+    Least-recently-used cache of BFS trees keyed by source, so that
+    repeated queries from the same source only walk parent pointers.
+
+    Each compact tree holds three int32 buffers over all people,
+    so `maxsize` bounds memory at about 12 bytes * people * maxsize.
+    """
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self.trees = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def tree(self, source):
+        """
+        Returns the BFS tree from `source`, computing it on a miss and
+        evicting the least recently used tree when full.
+        """
+        tree = self.trees.get(source)
+        if tree is not None:
+            self.hits += 1
+            self.trees.move_to_end(source)
+            return tree
+
+        self.misses += 1
+        tree = bfs_tree(source)
+        self.trees[source] = tree
+        if len(self.trees) > self.maxsize:
+            self.trees.popitem(last=False)
+        return tree
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+
+        If no possible path, returns None.
+        """
+        return self.tree(source).path_to(target)
+
+    def star_added(self, person_id, movie_id, co_stars):
+        """
+        Drops the trees that a new star of `movie_id` could change, given
+        the people who already starred in it.
+
+        The new edges join `person_id` to each co-star, and a BFS tree
+        stays valid unless one of them links two people whose depths differ
+        by more than one (counting unreachable as infinitely deep).
+        """
+        for source, tree in list(self.trees.items()):
+            depth = _depth(tree, person_id)
+            if any(abs(depth - _depth(tree, q)) > 1 for q in co_stars):
+                del self.trees[source]
+                self.invalidations += 1
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.trees))
+
+    def clear(self):
+        self.trees.clear()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+
+def _depth(tree, person_id):
+    distance = tree.distance(person_id)
+    return math.inf if distance is None else distance
@@ -0,0 +1,111 @@
+import csv
+import os
+
+import degrees
+
+
+def add_person(person_id, name, birth):
+    """
+    Adds a person to the loaded data.
+    Returns False if the person_id is already known.
+    """
+    if person_id in degrees.people:
+        return False
+    if degrees.graph is not None:
+        degrees.graph.add_person(person_id, name, birth)
+    else:
+        degrees.people[person_id] = {"name": name, "birth": birth, "movies": set()}
+        degrees.names.setdefault(name.lower(), set()).add(person_id)
+    degrees.name_index.add(person_id, name)
+    return True
+
+
+def add_movie(movie_id, title, year):
+    """
+    Adds a movie to the loaded data.
+    Returns False if the movie_id is already known.
+    """
+    if movie_id in degrees.movies:
+        return False
+    if degrees.graph is not None:
+        degrees.graph.add_movie(movie_id, title, year)
+    else:
+        degrees.movies[movie_id] = {"title": title, "year": year, "stars": set()}
+    return True
+
+
+def add_star(person_id, movie_id, caches=()):
+    """
+    Records that `person_id` starred in `movie_id` and tells each of
+    `caches` (a trees.TreeCache, landmarks.LandmarkOracle or anything with
+    a `star_added` method) so that it can drop or repair what changed.
+
+    Returns False if the star was already known, and raises KeyError if
+    the person or movie is unknown.
+    """
+    graph = degrees.graph
+    if graph is not None:
+        p = graph.person_index(person_id)
+        m = graph.movie_index(movie_id)
+        if p is None or m is None:
+            raise KeyError(person_id if p is None else movie_id)
+        co_stars = [graph.person_ids[q] for q in graph.stars_of(m)]
+        if not graph.add_star(p, m):
+            return False
+    else:
+        person = degrees.people[person_id]
+        movie = degrees.movies[movie_id]
+        if movie_id in person["movies"]:
+            return False
+        co_stars = list(movie["stars"])
+        person["movies"].add(movie_id)
+        movie["stars"].add(person_id)
+
+    degrees.name_index.touch(person_id, degrees.people[person_id]["name"])
+    for cache in caches:
+        cache.star_added(person_id, movie_id, co_stars)
+    return True
+
+
+def apply_updates(people_rows=(), movie_rows=(), star_rows=(), caches=()):
+    """
+    Applies appended (id, name, birth) people rows, (id, title, year) movie
+    rows and (person_id, movie_id) star rows to the loaded data in place,
+    in time proportional to the number of rows.
+
+    Returns the number of star rows dropped because they refer to
+    an unknown person or movie.
+    """
+    for person_id, name, birth in people_rows:
+        add_person(person_id, name, birth)
+    for movie_id, title, year in movie_rows:
+        add_movie(movie_id, title, year)
+    dropped = 0
+    for person_id, movie_id in star_rows:
+        try:
+            add_star(person_id, movie_id, caches)
+        except KeyError:
+            dropped += 1
+    return dropped
+
+
+def load_updates(directory, caches=()):
+    """
+    Applies the rows of whichever of people.csv, movies.csv and stars.csv
+    exist in `directory`, a delta in the same format as the full data.
+
+    Returns the number of star rows dropped.
+    """
+    def rows(filename, columns):
+        path = os.path.join(directory, filename)
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as f:
+            return [tuple(row[c] for c in columns) for row in csv.DictReader(f)]
+
+    return apply_updates(
+        rows("people.csv", ("id", "name", "birth")),
+        rows("movies.csv", ("id", "title", "year")),
+        rows("stars.csv", ("person_id", "movie_id")),
+        caches,
+    )
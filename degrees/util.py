@@ -36,3 +36,29 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class SearchStats():
+    """
+    Counters filled in by a search: people explored (removed from the
+    frontier), the largest frontier size, neighbor pairs examined and
+    wall time in seconds. Passing the same object to several searches
+    accumulates their totals.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.explored = 0
+        self.peak_frontier = 0
+        self.expansions = 0
+        self.elapsed = 0.0
+
+    def record(self, explored, peak_frontier, expansions):
+        self.explored += explored
+        self.peak_frontier = max(self.peak_frontier, peak_frontier)
+        self.expansions += expansions
+
+    def __repr__(self):
+        return (f"SearchStats(queries={self.queries}, explored={self.explored}, "
+                f"peak_frontier={self.peak_frontier}, "
+                f"expansions={self.expansions}, elapsed={self.elapsed:.6f})")
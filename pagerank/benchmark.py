@@ -0,0 +1,108 @@
+import os
+import random
+import sys
+import tempfile
+import time
+
+import crawler
+import pagerank
+
+# Chance that a link goes to a random page rather than copying a link
+# of a random earlier page, which makes popular pages more popular
+RANDOM_LINK = 0.2
+
+
+def generate(directory, num_pages, links=8, seed=0):
+    """
+    Writes `num_pages` HTML pages, 0.html to {num_pages - 1}.html, into
+    `directory`, linked like the web: most links copy the target of an
+    earlier link, so in-degrees follow a power law, and the number of
+    links on a page is Pareto-distributed with mean about `links`.
+    """
+    rng = random.Random(seed)
+    targets = []
+    for i in range(num_pages):
+        size = int(rng.paretovariate(2) * links / 2)
+        linked = set()
+        for _ in range(size):
+            if not targets or rng.random() < RANDOM_LINK:
+                linked.add(rng.randrange(num_pages))
+            else:
+                linked.add(rng.choice(targets))
+        targets.extend(linked)
+        anchors = "\n".join(f'<a href="{j}.html">{j}</a>' for j in sorted(linked))
+        with open(os.path.join(directory, f"{i}.html"), "w") as f:
+            f.write(f"<!DOCTYPE html>\n<html>\n<body>\n<h1>{i}</h1>\n{anchors}\n</body>\n</html>\n")
+
+
+def run(name, function, *args, **kwargs):
+    """
+    Calls `function`, printing its wall time and, for functions taking a
+    callback, the last values passed to it. Returns its result.
+    """
+    reports = []
+    if name in ("sample_pagerank", "iterate_pagerank"):
+        kwargs["callback"] = lambda *values: reports.append(values)
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    line = f"  {name:28} {time.perf_counter() - start:8.3f} s"
+    if reports:
+        iteration, residual, _, peak = reports[-1]
+        line += f"  {iteration:6} iterations  residual {residual:.2e}"
+        if peak is not None:
+            line += f"  peak {peak} KiB"
+    print(line)
+    return result
+
+
+def benchmark(directory, samples=pagerank.SAMPLES, seed=0, baseline=1000):
+    """
+    Prints the time taken to crawl the corpus in `directory`, then to rank
+    it by sampling and by iteration with every implementation.
+
+    The original sample_pagerank and iterate_pagerank, which take time
+    linear in the number of pages per sample and quadratic per iteration,
+    only run on corpora of at most `baseline` pages.
+    """
+    corpus = run("crawl", pagerank.crawl, directory)
+    print(f"{len(corpus)} pages, {sum(map(len, corpus.values()))} links")
+    run("crawler.crawl", crawler.crawl, directory)
+    if len(corpus) <= baseline:
+        random.seed(seed)
+        run("sample_pagerank", pagerank.sample_pagerank, corpus, pagerank.DAMPING, samples)
+    run("vectorized_sample_pagerank", pagerank.vectorized_sample_pagerank,
+        corpus, pagerank.DAMPING, samples, seed)
+    run("adaptive_sample_pagerank", pagerank.adaptive_sample_pagerank,
+        corpus, pagerank.DAMPING, seed=seed)
+    if len(corpus) <= baseline:
+        run("iterate_pagerank", pagerank.iterate_pagerank, corpus, pagerank.DAMPING)
+    run("sparse_pagerank", pagerank.sparse_pagerank, corpus, pagerank.DAMPING)
+    run("top_pagerank", pagerank.top_pagerank, corpus, pagerank.DAMPING, 100)
+    if pagerank.peak_memory() is not None:
+        print(f"Peak memory {pagerank.peak_memory()} KiB")
+
+
+def main():
+    args = sys.argv[1:]
+    options = {"--pages": "1000", "--samples": str(pagerank.SAMPLES),
+               "--baseline": "1000", "--seed": "0"}
+    for option in options:
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+    if len(args) > 1:
+        sys.exit("Usage: python benchmark.py [--pages N] [--samples N] "
+                 "[--baseline N] [--seed N] [corpus]")
+    seed = int(options["--seed"])
+
+    with tempfile.TemporaryDirectory() as temporary:
+        # Benchmark the given corpus, or generate one
+        directory = args[0] if args else temporary
+        if not args:
+            generate(directory, int(options["--pages"]), seed=seed)
+        benchmark(directory, int(options["--samples"]), seed, int(options["--baseline"]))
+
+
+if __name__ == "__main__":
+    main()
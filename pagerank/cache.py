@@ -0,0 +1,169 @@
+import os
+import sys
+import zipfile
+from array import array
+
+import numpy as np
+
+import crawler
+
+# File written into the corpus directory by `python cache.py directory`
+FILENAME = "pagerank.cache"
+
+# Arrays stored in the cache, all as numpy .npz members
+ARRAYS = ["page_offsets", "page_data", "mtimes", "sizes",
+          "link_offsets", "links", "name_offsets", "name_data"]
+
+
+def cache_path(directory):
+    return os.path.join(directory, FILENAME)
+
+
+def fingerprint(entry):
+    """
+    Returns the (mtime in nanoseconds, size) of an os.DirEntry.
+    """
+    stat = entry.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def read_cache(path):
+    """
+    Returns a dict mapping each page in the cache at `path` to its
+    (fingerprint, local link paths), or an empty dict if there is no
+    usable cache.
+    """
+    try:
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in ARRAYS}
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+        # Missing, truncated or corrupt: rebuild it
+        return {}
+    pages = [os.fsdecode(page) for page
+             in _strings(arrays["page_offsets"], arrays["page_data"])]
+    names = _strings(arrays["name_offsets"], arrays["name_data"])
+    link_offsets = arrays["link_offsets"]
+    links = arrays["links"].tolist()
+    return {
+        page: (
+            (int(arrays["mtimes"][i]), int(arrays["sizes"][i])),
+            [names[j] for j in links[link_offsets[i]:link_offsets[i + 1]]],
+        )
+        for i, page in enumerate(pages)
+    }
+
+
+def write_cache(path, entries):
+    """
+    Writes `entries`, a dict mapping each page to its (fingerprint, local
+    link paths), to `path` as flat arrays: a page table, fingerprints, and
+    the links of every page as indices into a table of link paths.
+    """
+    pages = list(entries)
+    names = {}
+    link_offsets = array("q", [0])
+    links = array("i")
+    for page in pages:
+        for name in entries[page][1]:
+            links.append(names.setdefault(name, len(names)))
+        link_offsets.append(len(links))
+
+    page_offsets, page_data = _table([os.fsencode(page) for page in pages])
+    name_offsets, name_data = _table(list(names))
+    arrays = {
+        "page_offsets": page_offsets,
+        "page_data": page_data,
+        "mtimes": np.array([entries[page][0][0] for page in pages], dtype=np.int64),
+        "sizes": np.array([entries[page][0][1] for page in pages], dtype=np.int64),
+        "link_offsets": np.frombuffer(link_offsets, dtype=np.int64),
+        "links": np.frombuffer(links, dtype=np.int32),
+        "name_offsets": name_offsets,
+        "name_data": name_data,
+    }
+
+    # Write to a temporary file first so readers never see a partial cache
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(temporary, path)
+
+
+def crawl_edges(directory, threads=crawler.THREADS):
+    """
+    Crawls `directory` like crawler.crawl_edges, but only parses the pages
+    whose modification time or size differs from the cache in the
+    directory, then updates the cache.
+
+    Returns (pages, sources, targets, parsed), where `parsed` is the
+    number of pages that had to be parsed.
+    """
+    path = cache_path(directory)
+    cached = read_cache(path)
+    entries = {}
+    stale = []
+    for page, entry in crawler.html_entries(directory):
+        key = fingerprint(entry)
+        hit = cached.get(page)
+        if hit is not None and hit[0] == key:
+            entries[page] = hit
+        else:
+            entries[page] = (key, None)
+            stale.append(page)
+    for page, links in crawler.parse(directory, stale, threads):
+        entries[page] = (entries[page][0], crawler.local_links(page, links))
+    if stale or len(entries) != len(cached):
+        write_cache(path, entries)
+
+    pages = sorted(entries)
+    index = {os.fsencode(page): i for i, page in enumerate(pages)}
+    sources = array("i")
+    targets = array("i")
+    for i, page in enumerate(pages):
+        linked = {index.get(name) for name in entries[page][1]}
+        linked.discard(None)
+        linked.discard(i)
+        sources.extend([i] * len(linked))
+        targets.extend(sorted(linked))
+    return pages, sources, targets, len(stale)
+
+
+def crawl(directory, threads=crawler.THREADS):
+    """
+    Returns the corpus dictionary of `directory` like crawler.crawl,
+    using and updating the cache in the directory.
+    """
+    pages, sources, targets, _ = crawl_edges(directory, threads)
+    return crawler.as_corpus(pages, sources, targets)
+
+
+def _table(strings):
+    """
+    Returns (offsets, data) arrays holding a list of byte strings.
+    """
+    offsets = np.zeros(len(strings) + 1, dtype=np.int64)
+    np.cumsum([len(string) for string in strings], out=offsets[1:])
+    data = np.frombuffer(b"".join(strings), dtype=np.uint8)
+    return offsets, data
+
+
+def _strings(offsets, data):
+    data = data.tobytes()
+    return [
+        data[offsets[i]:offsets[i + 1]]
+        for i in range(len(offsets) - 1)
+    ]
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python cache.py directory")
+    directory = sys.argv[1]
+
+    print("Crawling...")
+    pages, sources, _, parsed = crawl_edges(directory)
+    print(f"Wrote {cache_path(directory)} ({len(pages)} pages, "
+          f"{len(sources)} links, {parsed} pages parsed).")
+
+
+if __name__ == "__main__":
+    main()
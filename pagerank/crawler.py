@@ -0,0 +1,159 @@
+import mmap
+import os
+import posixpath
+import re
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Same pattern as pagerank.crawl, compiled once and run over raw bytes
+LINK = re.compile(rb"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Number of threads reading files, files per task and tasks in flight per thread
+THREADS = 8
+CHUNK = 64
+QUEUED = 4
+
+# Files at least this large are memory-mapped instead of read
+MMAP_SIZE = 1 << 20
+
+
+def html_files(directory):
+    """
+    Yields the path of every .html file below `directory`, relative to it
+    and with "/" separators, in sorted order within each directory.
+    """
+    for path, _ in html_entries(directory):
+        yield path
+
+
+def html_entries(directory, prefix="", visited=None):
+    """
+    Yields (path, os.DirEntry) for every .html file below `directory`,
+    like html_files. Symbolic links to directories are followed, but a
+    directory already walked is skipped, so link loops end.
+    """
+    if visited is None:
+        visited = set()
+    stat = os.stat(directory)
+    if (stat.st_dev, stat.st_ino) in visited:
+        return
+    visited.add((stat.st_dev, stat.st_ino))
+
+    with os.scandir(directory) as entries:
+        entries = sorted(entries, key=lambda entry: entry.name)
+    for entry in entries:
+        if entry.is_dir():
+            yield from html_entries(entry.path, prefix + entry.name + "/", visited)
+        elif entry.name.endswith(".html") and entry.is_file():
+            yield prefix + entry.name, entry
+
+
+def read_links(path):
+    """
+    Returns the href of every anchor in the file at `path`, as bytes.
+    Large files are memory-mapped, so they are never copied into memory.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < MMAP_SIZE:
+            return LINK.findall(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as contents:
+            return LINK.findall(contents)
+
+
+def read_chunk(directory, pages):
+    return [read_links(os.path.join(directory, page)) for page in pages]
+
+
+def resolve(folder, link):
+    """
+    Returns the corpus path, as bytes, that `link` points to from a page
+    in `folder`.
+    """
+    return posixpath.normpath(posixpath.join(folder, link))
+
+
+def local_links(page, links):
+    """
+    Returns the corpus paths, as bytes, of the `links` on `page` that are
+    not URLs, in order and without repeats.
+    """
+    folder = os.fsencode(posixpath.dirname(page))
+    paths = dict.fromkeys(resolve(folder, link) for link in links if b":" not in link)
+    return list(paths)
+
+
+def parse(directory, pages, threads=THREADS):
+    """
+    Yields (page, links) for every page in `pages`, in order, reading them
+    in chunks on a pool of `threads` threads. At most `threads * QUEUED`
+    chunks are read ahead, so memory stays bounded however large the
+    corpus is.
+    """
+    with ThreadPoolExecutor(threads) as executor:
+        pending = deque()
+        for start in range(0, len(pages), CHUNK):
+            chunk = pages[start:start + CHUNK]
+            pending.append((chunk, executor.submit(read_chunk, directory, chunk)))
+            if len(pending) >= threads * QUEUED:
+                chunk, future = pending.popleft()
+                yield from zip(chunk, future.result())
+        while pending:
+            chunk, future = pending.popleft()
+            yield from zip(chunk, future.result())
+
+
+def crawl_edges(directory, threads=THREADS):
+    """
+    Crawls every .html file below `directory` in one streaming pass.
+
+    Returns (pages, sources, targets): the sorted list of page paths and
+    two arrays holding, for every link from one page to another page in
+    the corpus, the indices of the linking and the linked page.
+    """
+    pages = sorted(html_files(directory))
+    sources = array("i")
+    targets = array("i")
+    for i, linked in page_links(directory, pages, threads):
+        sources.extend([i] * len(linked))
+        targets.extend(linked)
+    return pages, sources, targets
+
+
+def page_links(directory, pages, threads=THREADS):
+    """
+    Yields (i, linked) for the i-th page of `pages` in order, where
+    `linked` is the sorted list of indices of the other pages it links to.
+    """
+    index = {os.fsencode(page): i for i, page in enumerate(pages)}
+    for i, (page, links) in enumerate(parse(directory, pages, threads)):
+        folder = os.fsencode(posixpath.dirname(page)) if "/" in page else b""
+        linked = set()
+        for link in links:
+            # Links from the top level usually name a page exactly;
+            # anything else is normalized, unless it is a URL
+            j = None if folder else index.get(link)
+            if j is None and b":" not in link:
+                j = index.get(resolve(folder, link))
+            if j is not None and j != i:
+                linked.add(j)
+        yield i, sorted(linked)
+
+
+def crawl(directory, threads=THREADS):
+    """
+    Returns a dictionary mapping each page below `directory` to the set
+    of other pages in the corpus it links to, like pagerank.crawl.
+    """
+    return as_corpus(*crawl_edges(directory, threads))
+
+
+def as_corpus(pages, sources, targets):
+    """
+    Returns the corpus dictionary of a crawl's pages and edge arrays.
+    """
+    corpus = {page: set() for page in pages}
+    for i, j in zip(sources, targets):
+        corpus[pages[i]].add(pages[j])
+    return corpus
@@ -0,0 +1,237 @@
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+import numpy as np
+
+import crawler
+from matrix import Result
+from pagerank import DAMPING
+
+# File written into the corpus directory by `python outofcore.py corpus`
+FILENAME = "pagerank.edges"
+
+MAGIC = b"PREDGES1"
+
+# Header: magic, number of pages, edges and blocks, then the file offset
+# of the block index, which follows the edges
+HEADER = struct.Struct("<8sQQQQ")
+
+# Each block entry: first and last target page + 1, first and last edge + 1
+BLOCK_ENTRY = struct.Struct("<QQQQ")
+
+# Most edges held in memory at once, while building or iterating
+BLOCK_EDGES = 1 << 22
+
+
+class EdgeFile():
+    """
+    Link graph stored on disk as the float32 inverse out-degree of every
+    page, followed by blocks of (source, target) int32 pairs sorted by
+    target, so that each block covers one range of target pages.
+
+    Every buffer is memory-mapped; iterating only reads one block of
+    edges at a time.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                raise ValueError(f"{path} is not a PageRank edge file")
+            magic, self.num_pages, self.num_edges, num_blocks, index = \
+                HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a PageRank edge file")
+            f.seek(index)
+            self.blocks = [
+                BLOCK_ENTRY.unpack(f.read(BLOCK_ENTRY.size))
+                for _ in range(num_blocks)
+            ]
+        offset = HEADER.size
+        self.inverse = np.memmap(path, np.float32, "r", offset, (self.num_pages,))
+        offset += 4 * self.num_pages
+        self.edges = np.memmap(path, np.int32, "r", offset, (self.num_edges, 2))
+
+    def multiply(self, ranks, out):
+        """
+        Sets `out` to the rank flowing into every page along links,
+        streaming the edges block by block.
+        """
+        out[:] = 0
+        for lo, hi, start, end in self.blocks:
+            block = np.asarray(self.edges[start:end])
+            sources = block[:, 0]
+            flow = ranks[sources] * self.inverse[sources]
+            out[lo:hi] += np.bincount(block[:, 1] - lo, weights=flow, minlength=hi - lo)
+        return out
+
+
+def build(path, num_pages, chunks, block_edges=BLOCK_EDGES):
+    """
+    Writes an EdgeFile to `path` from `chunks`, an iterable of
+    (sources, targets) arrays of page indices below `num_pages`.
+
+    Edges are first written to a temporary file as runs of at most
+    `block_edges` edges sorted by target, while in- and out-degrees are
+    counted. The in-degrees then give the target range of every block, so
+    that each holds at most `block_edges` edges, and each block is merged
+    from its slice of every run. Apart from the caller's chunks, at most
+    one block of edges and vectors over the pages are in memory at a
+    time, however many edges there are.
+    """
+    out_degree = np.zeros(num_pages, dtype=np.int64)
+    in_degree = np.zeros(num_pages, dtype=np.int64)
+    runs = [0]
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path))) as temporary:
+        runs_path = os.path.join(temporary, "runs")
+        with open(runs_path, "wb") as spill:
+            for sources, targets in chunks:
+                out_degree += np.bincount(sources, minlength=num_pages)
+                in_degree += np.bincount(targets, minlength=num_pages)
+                for start in range(0, len(sources), block_edges):
+                    run = np.column_stack((sources[start:start + block_edges],
+                                           targets[start:start + block_edges])).astype(np.int32)
+                    spill.write(run[np.argsort(run[:, 1], kind="stable")].tobytes())
+                    runs.append(runs[-1] + len(run))
+        num_edges = runs[-1]
+
+        # Write to a temporary file first so readers never see a partial file
+        blocks = []
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as f:
+            f.write(bytes(HEADER.size))
+            inverse = np.zeros(num_pages, dtype=np.float32)
+            linked = out_degree > 0
+            inverse[linked] = 1 / out_degree[linked]
+            f.write(inverse.tobytes())
+            if num_edges:
+                edges = np.memmap(runs_path, np.int32, "r", shape=(num_edges, 2))
+                targets = [edges[start:end, 1] for start, end in zip(runs, runs[1:])]
+                cursors = runs[:-1]
+                bounds = block_bounds(in_degree, block_edges)
+                position = 0
+                for lo, hi in zip(bounds, bounds[1:]):
+                    cuts = [start + int(np.searchsorted(run, hi))
+                            for start, run in zip(runs, targets)]
+                    slices = [edges[start:end] for start, end in zip(cursors, cuts) if start < end]
+                    cursors = cuts
+                    if not slices:
+                        continue
+                    if hi - lo > 1:
+                        pairs = np.concatenate(slices)
+                        parts = [pairs[np.argsort(pairs[:, 1], kind="stable")]]
+                    else:
+                        # A single page may have more than block_edges links;
+                        # its slices are already sorted, so pack them as is
+                        parts = _pack(slices, block_edges)
+                    for block in parts:
+                        blocks.append((int(block[0, 1]), int(block[-1, 1]) + 1,
+                                       position, position + len(block)))
+                        f.write(block.tobytes())
+                        position += len(block)
+                del edges, targets
+            index = f.tell()
+            for entry in blocks:
+                f.write(BLOCK_ENTRY.pack(*entry))
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, num_pages, num_edges, len(blocks), index))
+    os.replace(temporary_path, path)
+
+
+def _pack(slices, block_edges):
+    """
+    Yields the edges of `slices`, each at most `block_edges` long, joined
+    into arrays of at most `block_edges` edges.
+    """
+    part = []
+    size = 0
+    for pairs in slices:
+        if size + len(pairs) > block_edges:
+            yield np.concatenate(part)
+            part = []
+            size = 0
+        part.append(pairs)
+        size += len(pairs)
+    if part:
+        yield np.concatenate(part)
+
+
+def block_bounds(in_degree, block_edges):
+    """
+    Returns the target pages starting each block, followed by the number
+    of pages, splitting pages into ranges of at most `block_edges` links;
+    a page with more links gets a range of its own.
+    """
+    total = np.cumsum(in_degree)
+    bounds = [0]
+    while bounds[-1] < len(in_degree):
+        lo = bounds[-1]
+        before = total[lo - 1] if lo else 0
+        hi = int(np.searchsorted(total, before + block_edges, side="right"))
+        bounds.append(max(hi, lo + 1))
+    return np.array(bounds)
+
+
+def crawl_chunks(directory, pages, block_edges=BLOCK_EDGES):
+    """
+    Yields the links between `pages` below `directory` as (sources,
+    targets) arrays of at most about `block_edges` edges, parsing pages
+    as the chunks are consumed, so that the edges are never all in memory.
+    """
+    sources = array("i")
+    targets = array("i")
+    for i, linked in crawler.page_links(directory, pages):
+        sources.extend([i] * len(linked))
+        targets.extend(linked)
+        if len(sources) >= block_edges:
+            yield np.frombuffer(sources, np.int32), np.frombuffer(targets, np.int32)
+            sources = array("i")
+            targets = array("i")
+    if sources:
+        yield np.frombuffer(sources, np.int32), np.frombuffer(targets, np.int32)
+
+
+def power_iteration(edges, damping, tolerance=0.001, max_iterations=1000):
+    """
+    Runs PageRank updates like matrix.power_iteration over an EdgeFile,
+    keeping only float32 rank vectors in memory.
+    """
+    n = edges.num_pages
+    ranks = np.full(n, 1 / n, dtype=np.float32)
+    new_ranks = np.empty(n, dtype=np.float32)
+    dangling = np.asarray(edges.inverse) == 0
+    residual = np.inf
+    iterations = 0
+    while iterations < max_iterations and residual > tolerance:
+        lost = ranks[dangling].sum(dtype=np.float64)
+        edges.multiply(ranks, new_ranks)
+        new_ranks *= damping
+        new_ranks += (damping * lost + 1 - damping) / n
+        residual = float(np.abs(new_ranks - ranks).max())
+        ranks, new_ranks = new_ranks, ranks
+        iterations += 1
+    return Result(ranks, iterations, residual)
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python outofcore.py corpus")
+    directory = sys.argv[1]
+    path = os.path.join(directory, FILENAME)
+
+    print("Crawling...")
+    pages = sorted(crawler.html_files(directory))
+    build(path, len(pages), crawl_chunks(directory, pages))
+    result = power_iteration(EdgeFile(path), DAMPING)
+    print(f"PageRank Results from Out-of-Core Iteration "
+          f"({result.iterations} iterations)")
+    for page, rank in zip(pages, result.ranks):
+        print(f"  {page}: {rank:.4f}")
+
+
+if __name__ == "__main__":
+    main()
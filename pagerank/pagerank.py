@@ -2,31 +2,116 @@ import os
 import random
 import re
 import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where no memory high-water mark is reported
+    resource = None
+
+import cache
+import crawler
+import sampling
+import solvers
+from matrix import (TransitionMatrix, personalized, push,
+                    teleport_matrix, top_k, warm_start)
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Samples between two calls of sample_pagerank's callback
+REPORT_EVERY = 1000
+
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
-    print(f"PageRank Results from Sampling (n = {SAMPLES})")
-    for page in sorted(ranks):
-        print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
-    print(f"PageRank Results from Iteration")
+    args = sys.argv[1:]
+    sparse = "--sparse" in args
+    if sparse:
+        args.remove("--sparse")
+    vectorized = "--vectorized" in args
+    if vectorized:
+        args.remove("--vectorized")
+    cached = "--cache" in args
+    if cached:
+        args.remove("--cache")
+    adaptive = "--adaptive" in args
+    if adaptive:
+        args.remove("--adaptive")
+    options = {"--workers": None, "--threads": None, "--solver": None,
+               "--tolerance": "0.001", "--norm": "inf", "--top": None}
+    for option in options:
+        if option in args:
+            i = args.index(option)
+            options[option] = args[i + 1]
+            del args[i:i + 2]
+    if len(args) != 1 or options["--solver"] not in (None, *solvers.SOLVERS):
+        sys.exit("Usage: python pagerank.py [--sparse] [--vectorized] [--adaptive] "
+                 f"[--cache] [--workers N] [--threads N] [--solver {'|'.join(solvers.SOLVERS)}] "
+                 "[--tolerance T] [--norm inf|1] [--top K] corpus")
+    workers = options["--workers"] and int(options["--workers"])
+    threads = options["--threads"] and int(options["--threads"])
+    solver = options["--solver"]
+    corpus = crawl(args[0], threads=threads, cached=cached)
+    if adaptive:
+        estimate = adaptive_sample_pagerank(corpus, DAMPING, float(options["--tolerance"]))
+        print(f"PageRank Results from Sampling (n = {estimate.walks} walks, "
+              f"{estimate.rounds} rounds)")
+        for page in sorted(estimate.ranks):
+            print(f"  {page}: {estimate.ranks[page]:.4f} "
+                  f"± {estimate.errors[page]:.4f}")
+    else:
+        if vectorized or workers is not None:
+            ranks = vectorized_sample_pagerank(corpus, DAMPING, SAMPLES, workers=workers)
+        else:
+            ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
+        print(f"PageRank Results from Sampling (n = {SAMPLES})")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
+    if options["--top"] is not None:
+        top = top_pagerank(corpus, DAMPING, int(options["--top"]),
+                           float(options["--tolerance"]))
+        certainty = "certified" if top.certified else f"within {top.bound:.2e}"
+        print(f"Top {len(top.pages)} PageRank Results from Iteration "
+              f"({top.iterations} iterations, {certainty})")
+        for page, rank in zip(top.pages, top.ranks):
+            print(f"  {page}: {rank:.4f}")
+        return
+    if sparse or solver is not None:
+        tolerance = float(options["--tolerance"])
+        norm = options["--norm"]
+        result = sparse_pagerank(corpus, DAMPING, tolerance, solver or "power", norm)
+        ranks = result.ranks
+        print(f"PageRank Results from Iteration ({result.iterations} iterations, "
+              f"residual {result.residual:.2e})")
+        if solver is not None:
+            baseline = sparse_pagerank(corpus, DAMPING, tolerance, "power", norm)
+            print(f"  {solver} saved {baseline.iterations - result.iterations} "
+                  f"iterations against power iteration")
+    else:
+        ranks = iterate_pagerank(corpus, DAMPING)
+        print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, threads=None, cached=False):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
+
+    If `threads` is given, use crawler.crawl instead: subdirectories are
+    crawled too, and files are memory-mapped and parsed by that many
+    threads in a single pass. If `cached` is true, also keep the parsed
+    links in a cache file in the directory and only parse the pages
+    added or modified since it was written.
     """
+    if cached:
+        return cache.crawl(directory, threads or crawler.THREADS)
+    if threads is not None:
+        return crawler.crawl(directory, threads)
+
     pages = dict()
 
     # Extract all links from HTML files
@@ -92,15 +177,33 @@ def transition_model(corpus, page, damping_factor):
     return probability_distribution
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def peak_memory():
+    """
+    Return the high-water mark of this process's resident memory in
+    kibibytes, or None where the platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kibibytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def sample_pagerank(corpus, damping_factor, n, callback=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
 
+    If `callback` is given, call it every REPORT_EVERY samples and after
+    the last one, whatever `n` is, with the number of samples so far,
+    the largest change of any estimate since the last call (or since
+    none, all zero), the seconds elapsed and peak_memory().
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
+    start = time.perf_counter()
 
     # Initialize dictionary dictionary to store PageRanks
     sample_pr = {page: 0 for page in corpus}
@@ -111,9 +214,20 @@ def sample_pagerank(corpus, damping_factor, n):
     # Initialize dictionary to store page counts
     page_counts = {page: 0 for page in corpus}
 
+    # Report how much the estimates moved since the last report
+    estimates = {page: 0 for page in corpus}
+
+    def report(samples):
+        nonlocal estimates
+        residual = max(abs(page_counts[page] / samples - estimates[page]) for page in corpus)
+        estimates = {page: page_counts[page] / samples for page in corpus}
+        callback(samples, residual, time.perf_counter() - start, peak_memory())
+
     # Choose ranom page to start from, and increment count
     current_page = random.choice(pages)
     page_counts[current_page] += 1
+    if callback is not None and n == 1:
+        report(1)
 
     # Get n number of psudorandom values from the probability distribution returned  by the transtion model
     for i in range(n - 1):
@@ -123,6 +237,10 @@ def sample_pagerank(corpus, damping_factor, n):
         current_page = random.choices(links, weights, k=1)[0]
         page_counts[current_page] += 1
 
+        samples = i + 2
+        if callback is not None and (samples % REPORT_EVERY == 0 or samples == n):
+            report(samples)
+
     # Calculate the rank based on count/n and store in sample_pr
     for page in corpus:
         sample_pr[page] = page_counts[page] / n
@@ -131,11 +249,89 @@ def sample_pagerank(corpus, damping_factor, n):
     return sample_pr
 
 
-def iterate_pagerank(corpus, damping_factor):
+def incremental_pagerank(corpus, damping_factor, previous, tolerance=0.001):
+    """
+    Return PageRank values like sparse_pagerank after the corpus changed,
+    starting from `previous`, the PageRank values computed before the
+    change, instead of from 1 / N. When only a few pages changed the
+    previous values are already close, so after one full iteration only
+    the residuals of pages near the changes are pushed along their links,
+    unless power iteration from there is expected to be cheaper.
+
+    Return a matrix.Result like sparse_pagerank, counting push rounds
+    as iterations.
+    """
+    matrix = TransitionMatrix.from_corpus(corpus)
+    start = warm_start(matrix, previous)
+    result = push(matrix, damping_factor, start, tolerance)
+    return result._replace(ranks=matrix.as_dict(result.ranks))
+
+
+def personalized_pagerank(corpus, damping_factor, seeds, tolerance=0.001):
+    """
+    Return one dictionary of personalized PageRank values per set of
+    pages in `seeds`: with probability `1 - damping_factor`, and from
+    pages without links, the random surfer jumps to a page of the seed
+    set instead of any page in the corpus.
+
+    All seed sets are solved together by one block power iteration over
+    the shared transition matrix.
+    """
+    matrix = TransitionMatrix.from_corpus(corpus)
+    teleport = teleport_matrix(matrix, seeds)
+    result = personalized(matrix, damping_factor, teleport, tolerance)
+    return [matrix.as_dict(ranks) for ranks in result.ranks.T]
+
+
+def vectorized_sample_pagerank(corpus, damping_factor, n, seed=None, workers=None):
+    """
+    Return PageRank values like sample_pagerank, but advance many random
+    surfers at once with NumPy over link arrays built once from the
+    corpus, instead of building a transition model at every step.
+
+    If `workers` is more than 1, split the samples over that many
+    processes. Passing the same `seed` (and number of workers) gives the
+    same PageRank values.
+    """
+    matrix = TransitionMatrix.from_corpus(corpus)
+    if workers is not None and workers > 1:
+        ranks = sampling.parallel_sample(matrix, damping_factor, n, seed, workers)
+    else:
+        ranks = sampling.sample(matrix, damping_factor, n, seed)
+    return matrix.as_dict(ranks)
+
+
+def adaptive_sample_pagerank(corpus, damping_factor, tolerance=0.001, k=None,
+                             seed=None):
+    """
+    Return PageRank values estimated from complete random walks started
+    from every page, each ending when the surfer would jump to a random
+    page, sampling until the estimates are accurate enough instead of
+    taking a fixed number of samples.
+
+    Without `k`, stop once every PageRank value is within `tolerance`
+    with 95% confidence; with `k`, stop once the order of the k highest
+    PageRank values is settled to within `tolerance`.
+
+    Return a sampling.Estimate whose `ranks` and `errors` are dictionaries
+    mapping page names to PageRank values and to the half-width of their
+    95% confidence intervals.
+    """
+    matrix = TransitionMatrix.from_corpus(corpus)
+    estimate = sampling.adaptive_sample(matrix, damping_factor, tolerance, k, seed=seed)
+    return estimate._replace(ranks=matrix.as_dict(estimate.ranks),
+                             errors=matrix.as_dict(estimate.errors))
+
+
+def iterate_pagerank(corpus, damping_factor, callback=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
 
+    If `callback` is given, call it after every iteration with the
+    number of iterations so far, the largest change of any PageRank
+    value in it, the seconds elapsed and peak_memory().
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
@@ -147,6 +343,8 @@ def iterate_pagerank(corpus, damping_factor):
 
     # Initialize a dictionary with page names as keys, and initial values of 1 / N, N being number of pages
     pr = {page: 1 / N for page in corpus}
+    start = time.perf_counter()
+    iterations = 0
 
     while True:
         # Initialize variable to compute difference in probablities
@@ -188,6 +386,10 @@ def iterate_pagerank(corpus, damping_factor):
             # Assign new rank
             new_ranks[p] = new_rank
 
+        iterations += 1
+        if callback is not None:
+            callback(iterations, max_delta, time.perf_counter() - start, peak_memory())
+
         # Check loop break condition
         # If all values difference between pr(p) and pr(i) are within 0.001, break the loop
         if max_delta <= 0.001:
@@ -200,5 +402,41 @@ def iterate_pagerank(corpus, damping_factor):
     return pr
 
 
+def top_pagerank(corpus, damping_factor, k, tolerance=0.001):
+    """
+    Return the `k` pages with the highest PageRank values, iterating only
+    until their membership and order can no longer change, or until every
+    PageRank value is within `tolerance`.
+
+    Return a matrix.Top whose `pages` and `ranks` are lists of page names
+    and PageRank values, highest first.
+    """
+    matrix = TransitionMatrix.from_corpus(corpus)
+    top = top_k(matrix, damping_factor, k, tolerance)
+    return top._replace(pages=[matrix.pages[i] for i in top.pages],
+                        ranks=top.ranks.tolist())
+
+
+def sparse_pagerank(corpus, damping_factor, tolerance=0.001, solver="power",
+                    norm="inf", max_iterations=1000):
+    """
+    Return PageRank values like iterate_pagerank, using vectorized power
+    iteration over a sparse transition matrix built once from the corpus,
+    so that each iteration costs O(links) instead of O(pages ** 2).
+
+    `solver` names one of solvers.SOLVERS to use instead of plain power
+    iteration. Iteration stops once the ranks change by at most
+    `tolerance`, measured in the L-infinity ("inf") or L1 ("1") `norm`,
+    or after `max_iterations` iterations.
+
+    Return a matrix.Result whose `ranks` is a dictionary mapping page
+    names to PageRank values, along with the number of iterations run
+    and the change in the last one.
+    """
+    matrix = TransitionMatrix.from_corpus(corpus)
+    result = solvers.solve(matrix, damping_factor, solver, tolerance, max_iterations, norm)
+    return result._replace(ranks=matrix.as_dict(result.ranks))
+
+
 if __name__ == "__main__":
     main()
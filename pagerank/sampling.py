@@ -0,0 +1,216 @@
+import math
+import multiprocessing
+from collections import namedtuple
+from statistics import NormalDist
+
+import numpy as np
+
+# Number of random surfers advanced together by `sample`
+WALKERS = 65536
+
+# Largest bias left by a surfer's start: after t steps from the uniform
+# distribution a surfer's position is off by at most damping ** t
+BIAS = 1e-6
+
+# Fewest rounds of complete paths before confidence intervals are trusted
+MIN_ROUNDS = 30
+
+# Estimate from `adaptive_sample`: PageRank values, the half-width of the
+# confidence interval of each, the number of walks and rounds of walks
+Estimate = namedtuple("Estimate", ["ranks", "errors", "walks", "rounds"])
+
+# TransitionMatrix shared with the workers of `parallel_sample` by forking
+_matrix = None
+
+
+def walk(matrix, damping, positions, steps, rng, counts=None):
+    """
+    Advances every surfer in `positions` by `steps` steps of the random
+    surfer model, adding each page it lands on to `counts`.
+
+    At every step a surfer follows one of its page's links, chosen
+    uniformly from the page's slice of the outgoing link array, with
+    probability `damping`; otherwise, or on a page without links, it jumps
+    to a page chosen uniformly from the whole corpus.
+
+    Returns the final positions and the counts.
+    """
+    n = matrix.num_pages
+    offsets, targets = matrix.outgoing()
+    degree = np.diff(offsets)
+    if counts is None:
+        counts = np.zeros(n, dtype=np.int64)
+    for _ in range(steps):
+        here = degree[positions]
+        follow = (rng.random(len(positions)) < damping) & (here > 0)
+        jump = ~follow
+        choice = (rng.random(np.count_nonzero(follow)) * here[follow]).astype(np.int64)
+        positions[follow] = targets[offsets[positions[follow]] + choice]
+        positions[jump] = rng.integers(n, size=np.count_nonzero(jump))
+        counts += np.bincount(positions, minlength=n)
+    return positions, counts
+
+
+def burn_in(damping):
+    """
+    Returns the number of steps a surfer takes before its samples count.
+    """
+    if damping >= 1:
+        return 1000
+    if damping <= 0:
+        return 0
+    return math.ceil(math.log(BIAS) / math.log(damping))
+
+
+def sample(matrix, damping, n, seed=None, walkers=WALKERS):
+    """
+    Returns the share of `n` samples landing on each page, taken by up to
+    `walkers` independent surfers that each start on a random page and
+    move in lockstep. Surfers take burn_in(damping) steps before counting,
+    and there are never so many that the burn-in outweighs the samples.
+
+    `seed` seeds a numpy.random.Generator, so the same seed gives the
+    same ranks.
+    """
+    rng = np.random.default_rng(seed)
+    counts = sample_counts(matrix, damping, n, rng, walkers)
+    return counts / n
+
+
+def sample_counts(matrix, damping, n, rng, walkers=WALKERS):
+    """
+    Returns how many of `n` samples drawn with `rng` land on each page.
+    """
+    pages = matrix.num_pages
+    warmup = burn_in(damping)
+    walkers = max(1, min(walkers, n // max(warmup, 1)))
+    positions = rng.integers(pages, size=walkers)
+    positions, _ = walk(matrix, damping, positions, warmup, rng)
+
+    # The last step may need only some of the surfers
+    steps, remainder = divmod(n, walkers)
+    positions, counts = walk(matrix, damping, positions, steps, rng)
+    if remainder:
+        walk(matrix, damping, positions[:remainder], 1, rng, counts)
+    return counts
+
+
+def parallel_sample(matrix, damping, n, seed=None, workers=None, walkers=WALKERS):
+    """
+    Returns the share of `n` samples landing on each page like `sample`,
+    splitting the samples over a pool of `workers` forked processes.
+
+    Each worker draws from its own stream spawned from a SeedSequence of
+    `seed`, and the visit counts are summed in worker order, so a given
+    seed and number of workers always gives the same ranks.
+    """
+    global _matrix
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    streams = np.random.SeedSequence(seed).spawn(workers)
+    tasks = [
+        (damping, n // workers + (i < n % workers), stream, walkers)
+        for i, stream in enumerate(streams)
+    ]
+
+    # Fork after setting the matrix so that workers share it
+    _matrix = matrix
+    context = multiprocessing.get_context("fork")
+    try:
+        with context.Pool(workers) as pool:
+            parts = pool.map(_sample_part, tasks)
+    finally:
+        _matrix = None
+    counts = np.zeros(matrix.num_pages, dtype=np.int64)
+    for part in parts:
+        counts += part
+    return counts / n
+
+
+def _sample_part(task):
+    damping, n, stream, walkers = task
+    if n == 0:
+        return np.zeros(_matrix.num_pages, dtype=np.int64)
+    return sample_counts(_matrix, damping, n, np.random.default_rng(stream), walkers)
+
+
+def complete_paths(matrix, damping, rounds, rng):
+    """
+    Returns a (rounds, pages) array with one PageRank estimate per row.
+
+    Every round starts one walk from each page. At every step a walk ends
+    with probability `1 - damping`; otherwise it follows one of its page's
+    links, or jumps to a random page from a page without links. Every page
+    a walk passes through, its first one included, counts as a visit, and
+    a round's visits times (1 - damping) / pages is an unbiased estimate
+    of the PageRank values.
+    """
+    n = matrix.num_pages
+    offsets, targets = matrix.outgoing()
+    degree = np.diff(offsets)
+    positions = np.tile(np.arange(n), rounds)
+    walks = np.repeat(np.arange(rounds) * n, n)
+    visits = np.zeros(rounds * n, dtype=np.int64)
+    while len(positions):
+        visits += np.bincount(walks + positions, minlength=rounds * n)
+        alive = rng.random(len(positions)) < damping
+        positions = positions[alive]
+        walks = walks[alive]
+        here = degree[positions]
+        follow = here > 0
+        choice = (rng.random(np.count_nonzero(follow)) * here[follow]).astype(np.int64)
+        positions[follow] = targets[offsets[positions[follow]] + choice]
+        positions[~follow] = rng.integers(n, size=np.count_nonzero(~follow))
+    return visits.reshape(rounds, n) * ((1 - damping) / n)
+
+
+def adaptive_sample(matrix, damping, tolerance=0.001, k=None, confidence=0.95,
+                    seed=None, max_walks=10 ** 8, walkers=WALKERS):
+    """
+    Returns an Estimate of the PageRank values from rounds of complete
+    paths, drawing more rounds until the estimates are accurate enough.
+
+    Without `k`, sampling stops once the `confidence` interval of every
+    page is at most `tolerance` either side of its estimate. With `k`, it
+    stops once the order of the k best pages is settled: each of the k + 1
+    best pages is either clear of the next one, their intervals not
+    overlapping, or both are known within `tolerance`. Sampling also stops
+    after `max_walks` walks.
+    """
+    n = matrix.num_pages
+    rng = np.random.default_rng(seed)
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    batch = max(1, walkers // n)
+    total = np.zeros(n)
+    squares = np.zeros(n)
+    rounds = 0
+    while True:
+        # Double the rounds until batches reach `walkers` walks
+        size = min(max(rounds, MIN_ROUNDS), batch, (max_walks - rounds * n) // n)
+        estimates = complete_paths(matrix, damping, max(size, 1), rng)
+        total += estimates.sum(axis=0)
+        squares += (estimates ** 2).sum(axis=0)
+        rounds += len(estimates)
+        ranks = total / rounds
+        variance = np.maximum(squares / rounds - ranks ** 2, 0) / max(rounds - 1, 1)
+        errors = z * np.sqrt(variance)
+        if rounds >= MIN_ROUNDS and _settled(ranks, errors, tolerance, k):
+            break
+        if (rounds + 1) * n > max_walks:
+            break
+    return Estimate(ranks, errors, rounds * n, rounds)
+
+
+def _settled(ranks, errors, tolerance, k):
+    """
+    Returns whether estimates with these confidence interval half-widths
+    meet the stopping rule of adaptive_sample.
+    """
+    if k is None:
+        return errors.max() <= tolerance
+    best = np.argsort(-ranks, kind="stable")[:k + 1]
+    low = ranks[best] - errors[best]
+    high = ranks[best] + errors[best]
+    clear = low[:-1] > high[1:]
+    known = (errors[best][:-1] <= tolerance) & (errors[best][1:] <= tolerance)
+    return bool(np.all(clear | known))
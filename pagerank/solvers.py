@@ -0,0 +1,78 @@
+import numpy as np
+
+from matrix import Result, distance, power_iteration
+
+# Number of page blocks updated in turn by a Gauss-Seidel sweep
+BLOCKS = 64
+
+
+def gauss_seidel(matrix, damping, tolerance=0.001, max_iterations=1000, norm="inf"):
+    """
+    Runs Gauss-Seidel sweeps: pages are updated in `BLOCKS` blocks, and
+    each block already reads the new ranks of the blocks before it. The
+    ranks flowing into a page are grouped by target in the matrix, so each
+    block is one contiguous slice of its links.
+    """
+    n = matrix.num_pages
+    bounds = np.linspace(0, n, min(BLOCKS, n) + 1).astype(np.int64)
+    blocks = []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        start, end = matrix.indptr[lo], matrix.indptr[hi]
+        counts = np.diff(matrix.indptr[lo:hi + 1])
+        linked = np.flatnonzero(counts)
+        blocks.append((lo, hi, matrix.sources[start:end], matrix.weights[start:end],
+                       linked, matrix.indptr[lo:hi][linked] - start))
+
+    closed = np.array_equal(np.bincount(matrix.sources, minlength=n), matrix.out_degree)
+    ranks = np.full(n, 1 / n)
+    lost = ranks[matrix.dangling].sum()
+    residual = np.inf
+    iterations = 0
+    while iterations < max_iterations and residual > tolerance:
+        previous = ranks.copy()
+        for lo, hi, sources, weights, linked, starts in blocks:
+            flow = np.zeros(hi - lo)
+            if len(sources):
+                flow[linked] = np.add.reduceat(ranks[sources] * weights, starts)
+            new_block = damping * flow + (damping * lost + 1 - damping) / n
+            dangling = matrix.dangling[lo:hi]
+            lost += (new_block[dangling] - ranks[lo:hi][dangling]).sum()
+            ranks[lo:hi] = new_block
+        if closed:
+            # Without links leaving the corpus the ranks sum to 1
+            ranks /= ranks.sum()
+            lost = ranks[matrix.dangling].sum()
+        residual = distance(ranks, previous, norm)
+        iterations += 1
+    return Result(ranks, iterations, float(residual))
+
+
+# Solvers by name; "power" is the baseline the others are measured against
+SOLVERS = {
+    "power": power_iteration,
+    "gauss-seidel": gauss_seidel,
+}
+
+
+def solve(matrix, damping, solver="power", tolerance=0.001, max_iterations=1000, norm="inf"):
+    """
+    Runs the named solver with the given stopping rule.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver: {solver}")
+    return SOLVERS[solver](matrix, damping, tolerance=tolerance,
+                           max_iterations=max_iterations, norm=norm)
+
+
+def compare(matrix, damping, tolerance=0.001, max_iterations=1000, norm="inf"):
+    """
+    Runs every solver and returns a dict mapping each name to its
+    (Result, sweeps saved against power iteration).
+    """
+    baseline = solve(matrix, damping, "power", tolerance, max_iterations, norm)
+    results = {}
+    for name in SOLVERS:
+        result = solve(matrix, damping, name, tolerance, max_iterations, norm)
+        results[name] = (result, baseline.iterations - result.iterations)
+    return results
+
@@ -0,0 +1,16 @@
+from pagerank import sample_pagerank
+
+corpus = {
+    "1.html": {"2.html", "3.html"},
+    "2.html": {"3.html"},
+    "3.html": {"2.html"}
+}
+damping_factor = 0.85
+
+# The last sample is always reported, even when it is the only one
+for n in (1, 5, 2500):
+    reports = []
+    sample_pagerank(corpus, damping_factor, n,
+                    callback=lambda samples, residual, *_: reports.append((samples, residual)))
+    print(f"n = {n}: reported samples {[samples for samples, _ in reports]}")
+    print(f"  last report covers the last sample: {reports[-1][0] == n}")
@@ -0,0 +1,19 @@
+from pagerank import iterate_pagerank, sparse_pagerank
+
+corpus = {
+    "1.html": {"2.html", "3.html"},
+    "2.html": {"3.html"},
+    "3.html": {"2.html"},
+    "4.html": set()
+}
+
+damping_factor = 0.85
+
+iterate_pr = iterate_pagerank(corpus, damping_factor)
+result = sparse_pagerank(corpus, damping_factor)
+
+print(f"Iterate PageRank: {iterate_pr}")
+print(f"Sparse PageRank: {result.ranks}")
+print(f"Iterations: {result.iterations}, residual: {result.residual}")
+print("Sparse sum:", sum(result.ranks.values()))
+print("Max difference:", max(abs(iterate_pr[p] - result.ranks[p]) for p in corpus))
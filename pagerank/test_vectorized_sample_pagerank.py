@@ -0,0 +1,19 @@
+from pagerank import vectorized_sample_pagerank, sparse_pagerank
+
+corpus = {
+    "1.html": {"2.html", "3.html"},
+    "2.html": {"3.html"},
+    "3.html": {"2.html"},
+    "4.html": set()
+}
+n = 1000000
+damping_factor = 0.85
+
+sample_pr = vectorized_sample_pagerank(corpus, damping_factor, n, seed=0)
+again = vectorized_sample_pagerank(corpus, damping_factor, n, seed=0)
+ranks = sparse_pagerank(corpus, damping_factor, tolerance=1e-10).ranks
+
+print(f"Vectorized sample PageRank: {sample_pr}")
+print("Sample sum:", sum(sample_pr.values()))
+print("Same seed, same ranks:", sample_pr == again)
+print("Max difference from iteration:", max(abs(sample_pr[p] - ranks[p]) for p in corpus))